@@ -7,13 +7,17 @@ from aiogram import BaseMiddleware, Bot, Dispatcher
 from aiogram.types import TelegramObject
 
 from app.repositories.drafts import DraftRepository
+from app.repositories.nudge_jobs import NudgeJobRepository
+from app.repositories.outbox import OutboxRepository
 from app.repositories.requests import RequestRepository
 from app.services.drafts import DraftService
 from app.services.requests import RequestService
+from app.services.user_context import UserContext
 from app.db import AsyncSessionLocal
 from app.handlers import admin, nudge3, nudge4, nudge5, nudge6, nudge7, start, amount, office, date, username, summary, nudge2, nudge1
 from app.config import settings
 from app.db import AsyncSessionLocal
+from app.infrastructure.messengers.telegram import OutboundThrottleMiddleware
 
 
 def setup_logging() -> None:
@@ -25,13 +29,19 @@ def setup_logging() -> None:
 
 class DbSessionMiddleware(BaseMiddleware):
     async def __call__(self, handler, event: TelegramObject, data: Dict[str, Any]):
+        # соединение из пула берётся только на первом запросе, апдейты без БД его не трогают
         async with AsyncSessionLocal() as session:
             data["session"] = session
+            user = data.get("event_from_user")
+            if user is not None:
+                data["user_ctx"] = UserContext(session, transport="tg", peer_id=user.id, telegram_user_id=user.id)
             return await handler(event, data)
 
 
 def build_bot() -> Bot:
-    return Bot(token=settings.BOT_TOKEN)
+    bot = Bot(token=settings.BOT_TOKEN)
+    bot.session.middleware(OutboundThrottleMiddleware())
+    return bot
 
 
 def build_dispatcher() -> Dispatcher:
@@ -60,8 +70,10 @@ def build_dispatcher() -> Dispatcher:
 def build_services(session):
     draft_repo = DraftRepository(session)
     request_repo = RequestRepository(session)
+    nudge_job_repo = NudgeJobRepository(session)
+    outbox_repo = OutboxRepository(session)
 
     draft_service = DraftService(draft_repo)
-    request_service = RequestService(draft_repo, request_repo)
+    request_service = RequestService(draft_repo, request_repo, nudge_job_repo, outbox_repo)
 
     return draft_service, request_service
\ No newline at end of file
@@ -12,8 +12,26 @@ class Settings(BaseSettings):
     nudge2_delay_seconds: int = 10       # 15 минут
     nudge3_delay_seconds: int = 10      # 100 минут
     nudge_worker_interval_seconds: int = 5 # обновление дожимов
+    nudge_worker_min_sleep_seconds: float = 1.0
+    nudge_worker_max_sleep_seconds: float = 60.0
+    nudge_batch_size: int = 50
+    nudge_lease_seconds: int = 120
+    nudge_drain_pause_seconds: float = 0.2
+    nudge_drain_max_seconds: float = 300.0
+    nudge_drain_report_every: int = 20
+    nudge_worker_id: str = ""
+    nudge_max_attempts: int = 10
+    nudge_retry_seconds: float = 60.0
+    nudge_retry_max_seconds: float = 3600.0
     nudge4_delay_seconds: int = 86400     # 24 часа
 
+    outbox_batch_size: int = 100
+    outbox_send_concurrency: int = 10
+    outbox_lease_seconds: int = 120
+    outbox_max_attempts: int = 8
+    outbox_retry_seconds: float = 30.0
+    outbox_retry_max_seconds: float = 3600.0
+
     nudge5_test_mode: bool = True
     nudge5_test_delay_seconds: int = 10
 
@@ -35,17 +53,64 @@ class Settings(BaseSettings):
     crm_base_url: str = ""
     crm_token: str = ""
     crm_timeout: float = 10.0
+    crm_http_max_connections: int = 20
+    crm_http_max_keepalive: int = 10
+    crm_http_keepalive_seconds: float = 30.0
+    crm_http2: bool = False
 
     crm_offices_path: str = "/offices"
     crm_rates_path: str = "/rates"
     crm_create_request_path: str = "/requests"
     crm_event_path: str = "/events"
+    crm_event_batch_path: str = ""
+    crm_event_batch_size: int = 50
+    crm_event_flush_seconds: float = 1.0
     crm_status_path: str = "/requests/status"
+    crm_status_bulk_path: str = ""
+    crm_status_bulk_size: int = 100
+    crm_status_cache_ttl_seconds: float = 30.0
+    crm_status_concurrency: int = 10
+    crm_status_timeout: float = 15.0
+    crm_status_local_ttl_seconds: float = 900.0
+    crm_sync_interval_seconds: int = 0  # 0 — фоновая сверка статусов выключена
+    crm_sync_page_size: int = 500
+    crm_sync_rate: float = 5.0  # вызовов CRM в секунду
+    crm_sync_max_age_days: int = 30
+    crm_webhook_host: str = "0.0.0.0"
+    crm_webhook_port: int = 0  # 0 — приём статусов от CRM выключен
+    crm_webhook_path: str = "/crm/status"
+    crm_webhook_secret: str = ""
+    crm_webhook_secret_header: str = "X-CRM-Secret"
+    crm_breaker_failure_threshold: int = 5
+    crm_breaker_reset_seconds: float = 30.0
+    office_cache_ttl_seconds: float = 600.0
+    office_cache_retry_seconds: float = 30.0
+    rate_cache_ttl_seconds: float = 30.0
+    rate_cache_refresh_ahead: float = 0.8
+    quote_ttl_seconds: int = 7200  # курс действителен 2 часа, см. DISCLAIMER
+
+    # промежуточные шаги анкеты (сумма, офис, дата, username) копятся в памяти процесса бота
+    # и пишутся пачкой; интервал должен быть заметно меньше nudge2_delay_seconds
+    draft_buffer_enabled: bool = False
+    draft_buffer_flush_seconds: float = 1.0
 
     crm_idempotency_header: str = "Idempotency-Key"
     crm_auth_header: str = "Authorization"
     crm_auth_prefix: str = "Bearer"
 
+    # лимиты исходящих сообщений считаются на процесс. Бот и воркер шлют от одного токена,
+    # поэтому глобальный лимит мессенджера поделён: бот (ответы) + воркер (дожимы, outbox) —
+    # 25 + 5 = 30 msg/s у Telegram, 15 + 5 = 20 запросов/с у VK. Воркер один на токен
+    tg_outbound_global_rate: float = 25.0
+    tg_outbound_worker_rate: float = 5.0
+    tg_outbound_peer_rate: float = 1.0
+    tg_outbound_peer_burst: int = 3
+    vk_outbound_global_rate: float = 15.0
+    vk_outbound_worker_rate: float = 5.0
+    vk_outbound_peer_rate: float = 1.0
+    vk_outbound_peer_burst: int = 3
+    outbound_max_retries: int = 3
+
     VK_TOKEN: str | None = None
     VK_GROUP_ID: int | None = None
 
@@ -3,6 +3,8 @@ from __future__ import annotations
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.drafts import DraftRepository
+from app.repositories.nudge_jobs import NudgeJobRepository
+from app.repositories.outbox import OutboxRepository
 from app.repositories.requests import RequestRepository
 from app.services.drafts import DraftService
 from app.services.requests import RequestService
@@ -11,8 +13,10 @@ from app.services.requests import RequestService
 def build_services(session: AsyncSession):
     draft_repo = DraftRepository(session)
     request_repo = RequestRepository(session)
+    nudge_job_repo = NudgeJobRepository(session)
+    outbox_repo = OutboxRepository(session)
 
     draft_service = DraftService(draft_repo)
-    request_service = RequestService(draft_repo, request_repo)
+    request_service = RequestService(draft_repo, request_repo, nudge_job_repo, outbox_repo)
 
     return draft_service, request_service
\ No newline at end of file
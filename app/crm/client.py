@@ -6,8 +6,10 @@ from typing import Any
 
 import httpx
 
-from app.crm.exceptions import CRMAuthError, CRMInvalidResponse, CRMTemporaryError
+from app.crm.exceptions import CRMAuthError, CRMCircuitOpenError, CRMInvalidResponse, CRMTemporaryError
 from app.crm.schemas import CreateRequestResult, Office, Rate
+from app.infrastructure.circuit_breaker import get_crm_breaker
+from app.infrastructure.http import get_http_client
 
 
 class CRMClientProtocol:
@@ -48,17 +50,26 @@ class CRMClientHTTP(CRMClientProtocol):
 
     async def _request(self, method: str, path: str, json: dict[str, Any] | None = None) -> dict[str, Any]:
         url = f"{self._base_url}{path}"
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            try:
-                r = await client.request(method, url, headers=self._headers(), json=json)
-            except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ConnectError) as e:
-                raise CRMTemporaryError(str(e)) from e
+        breaker = get_crm_breaker()
+        if not breaker.allow():
+            raise CRMCircuitOpenError(f"CRM circuit open, retry in {breaker.retry_in():.0f}s")
 
-        if r.status_code in (401, 403):
-            raise CRMAuthError(f"CRM auth failed: {r.status_code}")
+        try:
+            r = await get_http_client().request(method, url, headers=self._headers(), json=json, timeout=self._timeout)
+        except (httpx.ReadTimeout, httpx.ConnectTimeout, httpx.ConnectError) as e:
+            breaker.record_failure(e)
+            raise CRMTemporaryError(str(e)) from e
+        except BaseException as e:
+            breaker.record_failure(e)
+            raise
 
         if 500 <= r.status_code <= 599:
+            breaker.record_failure(f"CRM 5xx: {r.status_code}")
             raise CRMTemporaryError(f"CRM 5xx: {r.status_code}")
+        breaker.record_success()
+
+        if r.status_code in (401, 403):
+            raise CRMAuthError(f"CRM auth failed: {r.status_code}")
 
         try:
             data = r.json()
@@ -10,5 +10,9 @@ class CRMTemporaryError(CRMError):
     pass
 
 
+class CRMCircuitOpenError(CRMTemporaryError):
+    pass
+
+
 class CRMInvalidResponse(CRMError):
     pass
\ No newline at end of file
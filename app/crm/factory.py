@@ -4,11 +4,19 @@ from app.config import settings
 from app.crm.client import CRMClientHTTP, CRMClientMock, CRMClientProtocol
 
 
+_client: CRMClientProtocol | None = None
+
+
 def get_crm_client() -> CRMClientProtocol:
+    global _client
+    if _client is not None:
+        return _client
     if settings.crm_mode == "http":
-        return CRMClientHTTP(
+        _client = CRMClientHTTP(
             base_url=settings.crm_base_url,
             token=settings.crm_token,
             timeout_s=settings.crm_timeout,
         )
-    return CRMClientMock()
\ No newline at end of file
+    else:
+        _client = CRMClientMock()
+    return _client
\ No newline at end of file
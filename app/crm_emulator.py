@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+import math
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+
+from aiohttp import web
+
+from app.config import settings
+
+log = logging.getLogger("crm_emulator")
+
+OFFICES = [
+    {"id": "antalya_1", "button_text": "Анталья 1 (адрес)", "city": "Antalya"},
+    {"id": "antalya_2", "button_text": "Анталья 2 (адрес)", "city": "Antalya"},
+    {"id": "istanbul", "button_text": "Стамбул", "city": "Istanbul"},
+]
+
+BASE_RATES = {"antalya_1": 1.00, "antalya_2": 1.01, "istanbul": 0.99}
+
+# new -> in_work -> done, переход через status_step секунд
+STATUS_FLOW = ["new", "in_work", "done"]
+
+
+@dataclass
+class Faults:
+    latency_ms: float = 50.0
+    latency_sigma: float = 0.5
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    burst_every: float = 0.0
+    burst_seconds: float = 0.0
+    burst_status: int = 503
+    status_step: float = 0.0
+
+
+class CRMEmulator:
+    def __init__(self, faults: Faults) -> None:
+        self.faults = faults
+        self._started = time.monotonic()
+        self._requests: dict[str, dict] = {}
+        self._by_key: dict[str, str] = {}
+        self._events: dict[str, dict] = {}
+        self._seq = 0
+        self.stats: Counter[str] = Counter()
+
+    def build_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._faults_middleware])
+        app.router.add_get(settings.crm_offices_path, self.offices)
+        app.router.add_get(settings.crm_rates_path, self.rate)
+        app.router.add_post(settings.crm_rates_path, self.rate)
+        app.router.add_post(settings.crm_create_request_path, self.create_request)
+        app.router.add_post(settings.crm_event_path, self.event)
+        app.router.add_post(settings.crm_event_batch_path or "/events/batch", self.event_batch)
+        app.router.add_post(settings.crm_status_path, self.status)
+        app.router.add_post(settings.crm_status_bulk_path or "/requests/status/bulk", self.status_bulk)
+        app.router.add_get("/_emulator/stats", self.emulator_stats)
+        app.router.add_post("/_emulator/status", self.emulator_set_status)
+        return app
+
+    @web.middleware
+    async def _faults_middleware(self, request: web.Request, handler):
+        if request.path.startswith("/_emulator/"):
+            return await handler(request)
+
+        self.stats[f"{request.method} {request.path}"] += 1
+        await asyncio.sleep(self._latency())
+
+        if settings.crm_token:
+            expected = f"{settings.crm_auth_prefix} {settings.crm_token}".strip()
+            if request.headers.get(settings.crm_auth_header) != expected:
+                self.stats["401"] += 1
+                return web.json_response({"error": "unauthorized"}, status=401)
+
+        if self._in_burst():
+            self.stats[str(self.faults.burst_status)] += 1
+            return web.json_response({"error": "burst"}, status=self.faults.burst_status)
+        if random.random() < self.faults.throttle_rate:
+            self.stats["429"] += 1
+            return web.json_response({"error": "too many requests"}, status=429, headers={"Retry-After": "1"})
+        if random.random() < self.faults.error_rate:
+            self.stats["500"] += 1
+            return web.json_response({"error": "internal"}, status=500)
+
+        return await handler(request)
+
+    def _latency(self) -> float:
+        median = max(self.faults.latency_ms, 0.0) / 1000.0
+        if median <= 0:
+            return 0.0
+        return median * math.exp(random.gauss(0.0, max(self.faults.latency_sigma, 0.0)))
+
+    def _in_burst(self) -> bool:
+        if self.faults.burst_every <= 0 or self.faults.burst_seconds <= 0:
+            return False
+        return (time.monotonic() - self._started) % self.faults.burst_every < self.faults.burst_seconds
+
+    def _status_of(self, crm_request_id: str) -> dict:
+        req = self._requests.get(crm_request_id)
+        if req is None:
+            return {"crm_request_id": crm_request_id, "status": "new"}
+        status = req.get("status_override")
+        if status is None:
+            step = 0
+            if self.faults.status_step > 0:
+                step = int((time.monotonic() - req["created"]) // self.faults.status_step)
+            status = STATUS_FLOW[min(step, len(STATUS_FLOW) - 1)]
+        return {"crm_request_id": crm_request_id, "status": status}
+
+    async def offices(self, request: web.Request) -> web.Response:
+        return web.json_response({"offices": OFFICES})
+
+    async def rate(self, request: web.Request) -> web.Response:
+        params = dict(request.query)
+        if request.method == "POST":
+            params.update(await request.json())
+        office_id = str(params.get("office_id") or "")
+        if office_id not in BASE_RATES:
+            return web.json_response({"error": "unknown office"}, status=400)
+        rate = BASE_RATES[office_id] * (1 + random.uniform(-0.002, 0.002))
+        if params.get("direction") == "CASH_TO_USDT":
+            rate *= 0.995
+        return web.json_response({"rate": round(rate, 4)})
+
+    async def create_request(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        key = request.headers.get(settings.crm_idempotency_header) or str(payload.get("client_request_id") or "")
+        if key and key in self._by_key:
+            return web.json_response({"crm_request_id": self._by_key[key]})
+
+        self._seq += 1
+        crm_request_id = f"EMU-{self._seq}"
+        self._requests[crm_request_id] = {"payload": payload, "created": time.monotonic()}
+        if key:
+            self._by_key[key] = crm_request_id
+        return web.json_response({"crm_request_id": crm_request_id}, status=201)
+
+    async def event(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        key = request.headers.get(settings.crm_idempotency_header) or payload.get("event_id") or str(len(self._events))
+        self._events.setdefault(str(key), payload)
+        return web.json_response({"ok": True})
+
+    async def event_batch(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        for item in data.get("events") or []:
+            self._events.setdefault(str(item.get("idempotency_key")), item.get("payload"))
+        return web.json_response({"ok": True})
+
+    async def status(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        return web.json_response(self._status_of(str(payload.get("crm_request_id") or "")))
+
+    async def status_bulk(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        ids = [str(i) for i in payload.get("crm_request_ids") or []]
+        return web.json_response({"statuses": [self._status_of(i) for i in ids]})
+
+    async def emulator_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(
+            {
+                "calls": dict(self.stats),
+                "requests": len(self._requests),
+                "events": len(self._events),
+                "in_burst": self._in_burst(),
+            }
+        )
+
+    async def emulator_set_status(self, request: web.Request) -> web.Response:
+        payload = await request.json()
+        crm_request_id = str(payload.get("crm_request_id") or "")
+        req = self._requests.setdefault(crm_request_id, {"payload": {}, "created": time.monotonic()})
+        req["status_override"] = str(payload.get("status") or "new")
+        return web.json_response(self._status_of(crm_request_id))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Локальный эмулятор CRM для нагрузочных прогонов")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8088)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="медиана задержки ответа")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="sigma логнормального распределения задержки")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--burst-every", type=float, default=0.0, help="период окон сплошных ошибок, сек")
+    parser.add_argument("--burst-seconds", type=float, default=0.0, help="длительность окна ошибок, сек")
+    parser.add_argument("--burst-status", type=int, default=503)
+    parser.add_argument("--status-step", type=float, default=0.0, help="через сколько секунд заявка переходит в следующий статус")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        burst_every=args.burst_every,
+        burst_seconds=args.burst_seconds,
+        burst_status=args.burst_status,
+        status_step=args.status_step,
+    )
+    log.info("crm emulator on http://%s:%s faults=%s", args.host, args.port, faults)
+    web.run_app(CRMEmulator(faults).build_app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
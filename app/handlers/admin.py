@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from datetime import datetime
+
 from aiogram import Router
 from aiogram.filters import Command
 from aiogram.types import Message
@@ -7,8 +9,13 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.infrastructure.circuit_breaker import get_crm_breaker
 from app.infrastructure.crm_client import get_crm_client
 from app.models import Request
+from app.repositories.nudge_jobs import NudgeJobRepository
+from app.repositories.outbox import OutboxRepository
+from app.repositories.requests import RequestRepository
+from app.services.crm_status import normalize_status
 
 router = Router()
 
@@ -70,6 +77,12 @@ async def admin_request(message: Message, session: AsyncSession):
         await message.answer("Заявка не найдена.")
         return
 
+    jobs = NudgeJobRepository(session)
+    planned = {}
+    for kind in ("nudge5", "nudge6", "nudge7"):
+        job = await jobs.get(kind, req.id)
+        planned[kind] = f"{job.due_at} ({job.state})" if job else None
+
     text = (
         f"Заявка #{req.id}\n"
         f"uid: {req.telegram_user_id}\n"
@@ -81,9 +94,9 @@ async def admin_request(message: Message, session: AsyncSession):
         f"rate: {req.rate}\n"
         f"receive_amount: {req.receive_amount}\n"
         f"username: {req.username}\n\n"
-        f"n5: planned={req.nudge5_planned_at} sent={req.nudge5_sent_at} answer={req.nudge5_answer}\n"
-        f"n6: planned={req.nudge6_planned_at} sent={req.nudge6_sent_at} answer={req.nudge6_answer}\n"
-        f"n7: planned={req.nudge7_planned_at} sent={req.nudge7_sent_at} answer={req.nudge7_answer}\n"
+        f"n5: planned={planned['nudge5']} sent={req.nudge5_sent_at} answer={req.nudge5_answer}\n"
+        f"n6: planned={planned['nudge6']} sent={req.nudge6_sent_at} answer={req.nudge6_answer}\n"
+        f"n7: planned={planned['nudge7']} sent={req.nudge7_sent_at} answer={req.nudge7_answer}\n"
     )
 
     await message.answer(text)
@@ -97,7 +110,7 @@ async def admin_crm_get(message: Message, session: AsyncSession):
 
     parts = (message.text or "").split()
     if len(parts) < 2:
-        await message.answer("Использование: /admin_crm_get <request_id>")
+        await message.answer("Использование: /admin_crm_get <request_id> [live]")
         return
 
     try:
@@ -111,10 +124,39 @@ async def admin_crm_get(message: Message, session: AsyncSession):
         await message.answer("Заявка не найдена или у неё нет crm_request_id.")
         return
 
+    live = len(parts) > 2 and parts[2].lower() == "live"
+    if req.status_synced_at is not None and not live:
+        await message.answer(
+            f"CRM status для заявки #{req.id}: {req.status or '-'}\n"
+            f"синхронизирован: {req.status_synced_at:%Y-%m-%d %H:%M:%S} UTC"
+        )
+        return
+
     crm = get_crm_client()
     st = await crm.check_status(str(req.crm_request_id))
-    status = str(st.get("status") or "")
-    await message.answer(f"CRM status для заявки #{req.id}: {status or '-'}")
+    status = normalize_status(st)
+    if status:
+        repo = RequestRepository(session)
+        await repo.set_statuses({str(req.crm_request_id): status}, synced_at=datetime.utcnow())
+        await repo.save()
+    await message.answer(f"CRM status для заявки #{req.id}: {status or '-'} (из CRM)")
+
+
+@router.message(Command("admin_crm_breaker"))
+async def admin_crm_breaker(message: Message, session: AsyncSession):
+    if not _is_admin(message.from_user.id):
+        await message.answer(_deny_text())
+        return
+
+    st = get_crm_breaker().snapshot()
+    await message.answer(
+        f"CRM circuit breaker: {st['state']}\n"
+        f"failures: {st['failures']}/{st['threshold']}\n"
+        f"retry_in: {st['retry_in']}s\n"
+        f"rejected: {st['rejected']}\n"
+        f"since: {st['since']:%Y-%m-%d %H:%M:%S} UTC\n"
+        f"last_error: {st['last_error'] or '-'}"
+    )
 
 
 @router.message(Command("admin_crm_set"))
@@ -198,4 +240,66 @@ async def admin_crm_events(message: Message, session: AsyncSession):
         payload = e.get("payload") or {}
         lines.append(f"• {payload.get('type') or payload.get('nudge_type') or '-'} | {payload.get('action') or payload.get('answer') or '-'}")
 
-    await message.answer("\n".join(lines))
\ No newline at end of file
+    await message.answer("\n".join(lines))
+
+
+@router.message(Command("admin_dead"))
+async def admin_dead(message: Message, session: AsyncSession):
+    if not _is_admin(message.from_user.id):
+        await message.answer(_deny_text())
+        return
+
+    parts = (message.text or "").split()
+    try:
+        limit = int(parts[1]) if len(parts) > 1 else 10
+    except Exception:
+        await message.answer("limit должен быть числом.")
+        return
+
+    outbox = OutboxRepository(session)
+    dead_messages = await outbox.list_dead(limit)
+    dead_jobs = await NudgeJobRepository(session).list_dead(limit)
+
+    if not dead_messages and not dead_jobs:
+        await message.answer("Dead letters нет.")
+        return
+
+    lines = [f"Outbox dead letters (всего {await outbox.count_dead()}):"]
+    for m in dead_messages:
+        target = m.payload.get("peer_id") or m.payload.get("crm_request_id") or m.payload.get("client_request_id") or "-"
+        lines.append(f"• #{m.id} | {m.kind} | {target} | attempts={m.attempts} | {(m.last_error or '-')[:200]}")
+
+    lines.append("")
+    lines.append("Дожимы в dead:")
+    for j in dead_jobs:
+        lines.append(f"• #{j.id} | {j.kind} | target={j.target_id} | {j.transport}:{j.peer_id} | attempts={j.attempts}")
+
+    lines.append("")
+    lines.append("Повторить отправку: /admin_outbox_retry <id>")
+    await message.answer("\n".join(lines))
+
+
+@router.message(Command("admin_outbox_retry"))
+async def admin_outbox_retry(message: Message, session: AsyncSession):
+    if not _is_admin(message.from_user.id):
+        await message.answer(_deny_text())
+        return
+
+    parts = (message.text or "").split()
+    if len(parts) < 2:
+        await message.answer("Использование: /admin_outbox_retry <outbox_id>")
+        return
+
+    try:
+        outbox_id = int(parts[1])
+    except Exception:
+        await message.answer("outbox_id должен быть числом.")
+        return
+
+    outbox = OutboxRepository(session)
+    if not await outbox.requeue(outbox_id):
+        await message.answer("Запись не найдена или она не в dead.")
+        return
+
+    await outbox.save()
+    await message.answer(f"Запись #{outbox_id} снова в очереди.")
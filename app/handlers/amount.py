@@ -1,24 +1,22 @@
 from __future__ import annotations
-from datetime import datetime
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.config import settings
-from app.models import Draft
 from app.states import ExchangeFlow
 from app.utils import parse_amount
-from app.keyboards import kb_offices
-from app.infrastructure.crm_client import get_crm_client, CRMTemporaryError, CRMPermanentError
+from app.infrastructure.crm_client import CRMTemporaryError, CRMPermanentError
+from app.services.offices import get_office_directory
+from app.services.user_context import UserContext
 
 router = Router()
 
 
 @router.message(ExchangeFlow.entering_amount)
-async def enter_amount(message: Message, state: FSMContext, session: AsyncSession):
+async def enter_amount(message: Message, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     try:
         amount = parse_amount(message.text)
     except Exception:
@@ -28,21 +26,12 @@ async def enter_amount(message: Message, state: FSMContext, session: AsyncSessio
         )
         return
 
-    tg_id = message.from_user.id
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
-    if draft is None:
-        draft = Draft(transport="tg", peer_id=tg_id, telegram_user_id=tg_id, last_step="start")
-        session.add(draft)
+    draft = await user_ctx.draft_or_create()
 
-    draft.give_amount = float(amount)
-    draft.last_step = "amount"
-    draft.updated_at = datetime.utcnow()
+    await user_ctx.stage(draft, give_amount=float(amount), last_step="amount")
 
-    await session.commit()
-
-    crm = get_crm_client()
     try:
-        offices = await crm.get_offices()
+        keyboard = await get_office_directory().keyboard()
     except (CRMTemporaryError, CRMPermanentError):
         await message.answer(
             "Сейчас не могу получить список офисов. Попробуйте чуть позже или напишите менеджеру @coinpointlara."
@@ -56,7 +45,7 @@ async def enter_amount(message: Message, state: FSMContext, session: AsyncSessio
 
     await message.answer(
         "Выберите, пожалуйста, где вам удобнее провести обмен",
-        reply_markup=kb_offices(offices),
+        reply_markup=keyboard,
     )
 
     await state.set_state(ExchangeFlow.choosing_office)
\ No newline at end of file
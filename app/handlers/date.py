@@ -3,19 +3,18 @@ from datetime import date
 from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, User
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.keyboards import kb_next
-from app.models import Draft
 from app.states import ExchangeFlow
 from app.utils import parse_date_ddmmyyyy
+from app.services.user_context import UserContext
 
 router = Router()
 
 
 @router.message(ExchangeFlow.entering_date)
-async def enter_date_manual(message: Message, state: FSMContext, session: AsyncSession):
+async def enter_date_manual(message: Message, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     try:
         d = parse_date_ddmmyyyy(message.text)
     except Exception:
@@ -31,49 +30,32 @@ async def enter_date_manual(message: Message, state: FSMContext, session: AsyncS
         await message.answer("Дата не может быть в прошлом. Введите другую дату.")
         return
 
-    tg_id = message.from_user.id
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
-    if draft is None:
-        draft = Draft(transport="tg", peer_id=tg_id, telegram_user_id=tg_id, last_step="start")
-        session.add(draft)
+    draft = await user_ctx.draft_or_create()
 
-    draft.desired_date = d
-    draft.last_step = "date"
-    await session.commit()
+    await user_ctx.stage(draft, desired_date=d, last_step="date")
 
-    await go_username_step(message=message, user=message.from_user, state=state, session=session)
+    await go_username_step(message=message, user=message.from_user, state=state, session=session, user_ctx=user_ctx)
 
 
 @router.callback_query(ExchangeFlow.entering_date, F.data == "next")
-async def enter_date_default(cb: CallbackQuery, state: FSMContext, session: AsyncSession):
+async def enter_date_default(cb: CallbackQuery, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     await cb.answer()
 
-    tg_id = cb.from_user.id
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
-    if draft is None:
-        draft = Draft(transport="tg", peer_id=tg_id, telegram_user_id=tg_id, last_step="start")
-        session.add(draft)
+    draft = await user_ctx.draft_or_create()
 
-    draft.desired_date = date.today()
-    draft.last_step = "date_default"
-    await session.commit()
+    await user_ctx.stage(draft, desired_date=date.today(), last_step="date_default")
 
-    await go_username_step(message=cb.message, user=cb.from_user, state=state, session=session)
+    await go_username_step(message=cb.message, user=cb.from_user, state=state, session=session, user_ctx=user_ctx)
 
 
-async def go_username_step(message: Message, user: User, state: FSMContext, session: AsyncSession):
+async def go_username_step(message: Message, user: User, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     tg_id = user.id
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
-    if draft is None:
-        draft = Draft(transport="tg", peer_id=tg_id, telegram_user_id=tg_id, last_step="start")
-        session.add(draft)
-        await session.commit()
+    draft = await user_ctx.draft_or_create()
 
     username = (user.username or "").strip()
     if username:
-        draft.username = username
-        draft.last_step = "username_auto"
-        await session.commit()
+        # в БД уйдёт вместе с коммитом сводки
+        await user_ctx.stage(draft, username=username, last_step="username_auto")
 
         await message.answer("Ок, контакт в Telegram найден. Готовлю сводку…")
         await state.set_state(ExchangeFlow.confirming)
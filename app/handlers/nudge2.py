@@ -3,42 +3,27 @@ from datetime import datetime
 from aiogram import Router, F
 from aiogram.types import CallbackQuery
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.config import settings
-from app.models import Draft
 from app.keyboards import kb_start
+from app.repositories.nudge_jobs import NudgeJobRepository
+from app.services.crm_events import enqueue_nudge_event
 from app.states import ExchangeFlow
-from app.infrastructure.crm_client import get_crm_client
+from app.services.user_context import UserContext
 
 router = Router()
 
 
-async def _send_crm_event(draft: Draft, action: str) -> None:
-    crm = get_crm_client()
-    payload = {
-        "event_type": "nudge2",
-        "action": action,
-        "telegram_user_id": int(draft.telegram_user_id),
-        "client_request_id": draft.client_request_id,
-        "timestamp": datetime.utcnow().isoformat(),
-    }
-    try:
-        await crm.send_event(payload, idempotency_key=f"n2:{draft.telegram_user_id}:{action}:{int(datetime.utcnow().timestamp())}")
-    except Exception:
-        return
-
-
 @router.callback_query(F.data.startswith("n2:"))
-async def n2_click(cb: CallbackQuery, state: FSMContext, session: AsyncSession):
+async def n2_click(cb: CallbackQuery, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     await cb.answer()
 
     action = cb.data.split(":", 1)[1]
     tg_id = cb.from_user.id
 
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
+    draft = await user_ctx.draft()
     if draft is None:
         await cb.message.answer("Нажмите /start чтобы начать заново.", reply_markup=kb_start())
         return
@@ -46,10 +31,9 @@ async def n2_click(cb: CallbackQuery, state: FSMContext, session: AsyncSession):
     if action == "continue":
         draft.nudge2_answer = "continue"
         draft.updated_at = datetime.utcnow()
+        await enqueue_nudge_event(session, draft, "nudge2", "continue")
         await session.commit()
 
-        await _send_crm_event(draft, "continue")
-
         if draft.direction and draft.give_amount and draft.office_id and draft.desired_date:
             from app.handlers.summary import send_summary
             await send_summary(cb.message, state, session, user_id=tg_id)
@@ -70,10 +54,9 @@ async def n2_click(cb: CallbackQuery, state: FSMContext, session: AsyncSession):
     if action == "manager":
         draft.nudge2_answer = "manager"
         draft.updated_at = datetime.utcnow()
+        await enqueue_nudge_event(session, draft, "nudge2", "manager")
         await session.commit()
 
-        await _send_crm_event(draft, "manager")
-
         await cb.message.answer(
             "Передал запрос менеджеру ✅ Если нужно — можете написать напрямую: @coinpointlara"
         )
@@ -83,13 +66,18 @@ async def n2_click(cb: CallbackQuery, state: FSMContext, session: AsyncSession):
         draft.nudge2_answer = "later"
         draft.nudge2_answered_at = datetime.utcnow()
         delay = int(getattr(settings, "nudge4_delay_seconds", 86400))
-        draft.nudge4_planned_at = draft.nudge2_answered_at + timedelta(seconds=delay)
+        await NudgeJobRepository(session).schedule(
+            "nudge4",
+            draft.id,
+            transport=draft.transport,
+            peer_id=draft.peer_id,
+            due_at=draft.nudge2_answered_at + timedelta(seconds=delay),
+        )
         draft.nudge4_sent_at = None
         draft.nudge4_answer = None
         draft.updated_at = datetime.utcnow()
+        await enqueue_nudge_event(session, draft, "nudge2", "later")
         await session.commit()
 
-        await _send_crm_event(draft, "later")
-
         await cb.message.answer("Хорошо, понял. Если решите продолжить — нажмите /start.")
         return
\ No newline at end of file
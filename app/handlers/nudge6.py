@@ -8,7 +8,7 @@ from aiogram.types import CallbackQuery
 
 from app.db import AsyncSessionLocal
 from app.models import Request
-from app.services.crm_events import send_request_nudge_event
+from app.services.crm_events import enqueue_request_nudge_event
 
 log = logging.getLogger("nudge6")
 
@@ -43,11 +43,8 @@ async def on_nudge6_answer(call: CallbackQuery):
 
         req.nudge6_answer = answer
         req.nudge6_answered_at = now
+        await enqueue_request_nudge_event(session, req, "nudge6", action)
         await session.commit()
-        try:
-            await send_request_nudge_event(req, "nudge5", action)
-        except Exception:
-            log.exception("CRM event failed: nudge5")
 
     if answer == "YES":
         await call.message.answer("Отлично. Передал менеджеру, он свяжется с вами в Telegram.")
@@ -8,7 +8,7 @@ from aiogram.types import CallbackQuery
 
 from app.db import AsyncSessionLocal
 from app.models import Request
-from app.services.crm_events import send_request_nudge_event
+from app.services.crm_events import enqueue_request_nudge_event
 
 log = logging.getLogger("nudge7")
 
@@ -42,11 +42,8 @@ async def on_nudge7_answer(call: CallbackQuery):
 
         req.nudge7_answer = answer
         req.nudge7_answered_at = now
+        await enqueue_request_nudge_event(session, req, "nudge7", action)
         await session.commit()
-        try:
-            await send_request_nudge_event(req, "nudge5", action)
-        except Exception:
-            log.exception("CRM event failed: nudge5")
 
     if answer == "YES":
         await call.message.answer("Отлично. Передал менеджеру, он свяжется с вами в Telegram.")
@@ -2,14 +2,15 @@ from aiogram import Router, F
 from aiogram.filters import CommandStart
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 
 from app.config import settings
-from app.models import Direction, Draft
+from app.models import Direction
 from app.keyboards import kb_start
+from app.repositories.nudge_jobs import NudgeJobRepository
 from app.states import ExchangeFlow
+from app.services.user_context import UserContext
 
 router = Router()
 
@@ -28,14 +29,12 @@ START_TEXT = (
 
 
 @router.message(CommandStart())
-async def start_cmd(message: Message, state: FSMContext, session: AsyncSession):
+async def start_cmd(message: Message, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     await state.clear()
 
-    tg_id = message.from_user.id
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
+    draft = await user_ctx.draft()
     if draft is None:
-        draft = Draft(transport="tg", peer_id=tg_id, telegram_user_id=tg_id, last_step="start")
-        session.add(draft)
+        await user_ctx.draft_or_create()
     else:
         draft.direction = None
         draft.give_amount = None
@@ -61,6 +60,8 @@ async def start_cmd(message: Message, state: FSMContext, session: AsyncSession):
         draft.last_step = "start"
         draft.updated_at = datetime.utcnow()
 
+        await NudgeJobRepository(session).cancel(draft.id, "nudge2", "nudge3", "nudge4")
+
     await session.commit()
 
     await message.answer(START_TEXT, reply_markup=kb_start())
@@ -68,24 +69,26 @@ async def start_cmd(message: Message, state: FSMContext, session: AsyncSession):
 
 
 @router.callback_query(F.data.startswith("dir:"))
-async def choose_dir(cb: CallbackQuery, state: FSMContext, session: AsyncSession):
+async def choose_dir(cb: CallbackQuery, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     await cb.answer()
 
     direction_value = cb.data.split(":", 1)[1]
     direction = Direction(direction_value)
 
-    tg_id = cb.from_user.id
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
-    if draft is None:
-        draft = Draft(transport="tg", peer_id=tg_id, telegram_user_id=tg_id, last_step="start")
-        session.add(draft)
+    draft = await user_ctx.draft_or_create()
 
     draft.direction = direction
     draft.last_step = "amount_wait"
     draft.updated_at = datetime.utcnow()
 
     delay = int(getattr(settings, "nudge2_delay_seconds", 900))
-    draft.nudge2_planned_at = datetime.utcnow() + timedelta(seconds=delay)
+    await NudgeJobRepository(session).schedule(
+        "nudge2",
+        draft.id,
+        transport=draft.transport,
+        peer_id=draft.peer_id,
+        due_at=datetime.utcnow() + timedelta(seconds=delay),
+    )
     draft.nudge2_sent_at = None
     draft.nudge2_answer = None
 
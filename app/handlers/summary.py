@@ -11,6 +11,8 @@ from app.config import settings
 from app.states import ExchangeFlow
 from app.keyboards import kb_confirm, kb_start
 from app.repositories.drafts import DraftRepository
+from app.repositories.nudge_jobs import NudgeJobRepository
+from app.repositories.outbox import OutboxRepository
 from app.repositories.requests import RequestRepository
 from app.services.requests import RequestService
 from app.infrastructure.crm_client import CRMTemporaryError, CRMPermanentError
@@ -21,7 +23,8 @@ router = Router()
 async def send_summary(message: Message, state: FSMContext, session: AsyncSession, *, user_id: int) -> None:
     draft_repo = DraftRepository(session)
     request_repo = RequestRepository(session)
-    service = RequestService(draft_repo, request_repo)
+    nudge_jobs = NudgeJobRepository(session)
+    service = RequestService(draft_repo, request_repo, nudge_jobs, OutboxRepository(session))
 
     try:
         summary = await service.build_summary(user_id)
@@ -44,14 +47,20 @@ async def send_summary(message: Message, state: FSMContext, session: AsyncSessio
     await message.answer(summary.summary_text, reply_markup=kb_confirm())
     await state.set_state(ExchangeFlow.confirming)
 
-    draft = await draft_repo.get_by_user_id(user_id)
+    draft = await draft_repo.get_by_transport_peer_id("tg", user_id)
     if draft:
         now = datetime.utcnow()
         draft.step6_at = now
 
         if draft.nudge3_sent_at is None and draft.nudge3_answer is None:
             delay = int(getattr(settings, "nudge3_delay_seconds", 6000))
-            draft.nudge3_planned_at = now + timedelta(seconds=delay)
+            await nudge_jobs.schedule(
+                "nudge3",
+                draft.id,
+                transport=draft.transport,
+                peer_id=draft.peer_id,
+                due_at=now + timedelta(seconds=delay),
+            )
 
         await draft_repo.save()
 
@@ -61,7 +70,7 @@ async def confirm_no(cb: CallbackQuery, state: FSMContext, session: AsyncSession
     await cb.answer()
 
     draft_repo = DraftRepository(session)
-    draft = await draft_repo.get_by_user_id(cb.from_user.id)
+    draft = await draft_repo.get_by_transport_peer_id("tg", cb.from_user.id)
 
     if draft:
         draft.direction = None
@@ -77,6 +86,7 @@ async def confirm_no(cb: CallbackQuery, state: FSMContext, session: AsyncSession
         draft.nudge3_sent_at = None
         draft.nudge3_answer = None
 
+        await NudgeJobRepository(session).cancel(draft.id, "nudge3")
         await draft_repo.save()
 
     await state.clear()
@@ -93,7 +103,7 @@ async def confirm_yes(cb: CallbackQuery, state: FSMContext, session: AsyncSessio
 
     draft_repo = DraftRepository(session)
     request_repo = RequestRepository(session)
-    service = RequestService(draft_repo, request_repo)
+    service = RequestService(draft_repo, request_repo, NudgeJobRepository(session), OutboxRepository(session))
 
     try:
         result = await service.confirm_request(cb.from_user.id)
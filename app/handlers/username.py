@@ -1,18 +1,17 @@
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models import Draft
 from app.states import ExchangeFlow
 from app.utils import normalize_username
+from app.services.user_context import UserContext
 
 router = Router()
 
 
 @router.message(ExchangeFlow.entering_username)
-async def enter_username(message: Message, state: FSMContext, session: AsyncSession):
+async def enter_username(message: Message, state: FSMContext, session: AsyncSession, user_ctx: UserContext):
     try:
         username = normalize_username(message.text)
     except Exception:
@@ -20,10 +19,8 @@ async def enter_username(message: Message, state: FSMContext, session: AsyncSess
         return
 
     tg_id = message.from_user.id
-    draft = await session.scalar(select(Draft).where(Draft.telegram_user_id == tg_id))
-    draft.username = username
-    draft.last_step = "username_manual"
-    await session.commit()
+    draft = await user_ctx.draft()
+    await user_ctx.stage(draft, username=username, last_step="username_manual")
 
     await message.answer("Спасибо! Готовлю сводку…")
     await state.set_state(ExchangeFlow.confirming)
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+import time
+from datetime import datetime
+from typing import Any
+
+from app.config import settings
+
+log = logging.getLogger("circuit_breaker")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, *, failure_threshold: int = 5, reset_seconds: float = 30.0) -> None:
+        self.name = name
+        self._threshold = max(1, int(failure_threshold))
+        self._reset_seconds = float(reset_seconds)
+        self._state = STATE_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._last_error: str | None = None
+        self._last_change = datetime.utcnow()
+        self._rejected = 0
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_open(self) -> bool:
+        # открыт и ещё не пора пробовать — вызывать CRM бессмысленно
+        if self._state == STATE_OPEN:
+            return time.monotonic() - self._opened_at < self._reset_seconds
+        return self._state == STATE_HALF_OPEN and self._probe_in_flight
+
+    def retry_in(self) -> float:
+        if self._state != STATE_OPEN:
+            return 0.0
+        return max(0.0, self._reset_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        if self._state == STATE_CLOSED:
+            return True
+
+        if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self._reset_seconds:
+            self._set_state(STATE_HALF_OPEN)
+
+        if self._state == STATE_HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            log.info("circuit %s half-open, probing", self.name)
+            return True
+
+        self._rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._probe_in_flight = False
+        if self._state != STATE_CLOSED:
+            self._set_state(STATE_CLOSED)
+            log.info("circuit %s closed", self.name)
+
+    def record_failure(self, error: BaseException | str | None = None) -> None:
+        self._failures += 1
+        self._probe_in_flight = False
+        if error is not None:
+            self._last_error = repr(error) if isinstance(error, BaseException) else str(error)
+
+        if self._state == STATE_HALF_OPEN or self._failures >= self._threshold:
+            self._opened_at = time.monotonic()
+            if self._state != STATE_OPEN:
+                self._set_state(STATE_OPEN)
+                log.warning(
+                    "circuit %s opened: failures=%s retry_in=%.0fs last_error=%s",
+                    self.name,
+                    self._failures,
+                    self._reset_seconds,
+                    self._last_error,
+                )
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "state": self._state,
+            "failures": self._failures,
+            "threshold": self._threshold,
+            "retry_in": round(self.retry_in(), 1),
+            "rejected": self._rejected,
+            "last_error": self._last_error,
+            "since": self._last_change,
+        }
+
+    def _set_state(self, state: str) -> None:
+        self._state = state
+        self._last_change = datetime.utcnow()
+
+
+_crm_breaker: CircuitBreaker | None = None
+
+
+def get_crm_breaker() -> CircuitBreaker:
+    global _crm_breaker
+    if _crm_breaker is None:
+        _crm_breaker = CircuitBreaker(
+            "crm",
+            failure_threshold=settings.crm_breaker_failure_threshold,
+            reset_seconds=settings.crm_breaker_reset_seconds,
+        )
+    return _crm_breaker
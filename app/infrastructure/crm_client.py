@@ -8,6 +8,8 @@ from typing import Any, Literal, Optional
 import httpx
 
 from app.config import settings
+from app.infrastructure.circuit_breaker import STATE_HALF_OPEN, get_crm_breaker
+from app.infrastructure.http import close_http_client, get_http_client
 
 DirectionLiteral = Literal["USDT_TO_CASH", "CASH_TO_USDT"]
 
@@ -33,6 +35,10 @@ class CRMPermanentError(CRMError):
     pass
 
 
+class CRMCircuitOpenError(CRMTemporaryError):
+    pass
+
+
 def _join_url(base: str, path: str) -> str:
     base = (base or "").rstrip("/")
     path = (path or "").strip()
@@ -42,6 +48,9 @@ def _join_url(base: str, path: str) -> str:
 
 
 class CRMClientMock:
+    supports_bulk_status = True
+    supports_event_batch = True
+
     def __init__(self) -> None:
         self._offices = [
             {"id": "antalya_1", "button_text": "Анталья 1 (адрес)", "city": "Antalya"},
@@ -79,10 +88,17 @@ class CRMClientMock:
             }
         )
 
+    async def send_events(self, events: list[tuple[dict, str]]) -> None:
+        for payload, idempotency_key in events:
+            await self.send_event(payload, idempotency_key=idempotency_key)
+
     async def check_status(self, crm_request_id: str) -> dict:
         status = self._statuses.get(str(crm_request_id), "new")
         return {"status": status}
 
+    async def check_statuses(self, crm_request_ids: list[str]) -> dict[str, dict]:
+        return {str(i): {"status": self._statuses.get(str(i), "new")} for i in crm_request_ids}
+
     async def mock_set_status(self, crm_request_id: str, status: str) -> None:
         self._statuses[str(crm_request_id)] = str(status).strip()
 
@@ -119,17 +135,25 @@ class CRMClientHTTP:
         url = _join_url(self._base_url, path)
         last_err: Exception | None = None
 
+        breaker = get_crm_breaker()
+        if not breaker.allow():
+            raise CRMCircuitOpenError(f"{method} {path}: crm circuit open, retry in {breaker.retry_in():.0f}s")
+        if breaker.state == STATE_HALF_OPEN:
+            # пробный вызов — без повторов
+            max_attempts = 1
+
         for attempt in range(1, max_attempts + 1):
             try:
-                async with httpx.AsyncClient(timeout=self._timeout) as client:
-                    resp = await client.request(
-                        method=method,
-                        url=url,
-                        headers=self._headers(idempotency_key=idempotency_key),
-                        json=json,
-                    )
+                resp = await get_http_client().request(
+                    method=method,
+                    url=url,
+                    headers=self._headers(idempotency_key=idempotency_key),
+                    json=json,
+                    timeout=self._timeout,
+                )
 
                 if 200 <= resp.status_code < 300:
+                    breaker.record_success()
                     if resp.content:
                         return resp.json()
                     return None
@@ -139,6 +163,8 @@ class CRMClientHTTP:
                         f"{method} {path} temporary error {resp.status_code}"
                     )
 
+                # CRM отвечает, проблема в самом запросе
+                breaker.record_success()
                 raise CRMPermanentError(
                     f"{method} {path} permanent error {resp.status_code}: {resp.text[:300]}"
                 )
@@ -150,10 +176,15 @@ class CRMClientHTTP:
                 await asyncio.sleep(0.3 * (2 ** (attempt - 1)))
             except CRMPermanentError:
                 raise
+            except asyncio.CancelledError:
+                # отменили по таймауту снаружи — иначе пробный вызов так и останется «в полёте»
+                breaker.record_failure("cancelled")
+                raise
             except Exception as e:
                 last_err = e
                 break
 
+        breaker.record_failure(last_err)
         raise CRMTemporaryError(str(last_err) if last_err else "crm request failed")
 
     async def get_offices(self) -> list[dict]:
@@ -205,6 +236,20 @@ class CRMClientHTTP:
             max_attempts=3,
         )
 
+    @property
+    def supports_event_batch(self) -> bool:
+        return bool(settings.crm_event_batch_path)
+
+    async def send_events(self, events: list[tuple[dict, str]]) -> None:
+        # ключи идемпотентности передаём по событию — CRM дедуплицирует их так же, как в send_event
+        payload = {"events": [{"idempotency_key": key, "payload": p} for p, key in events]}
+        await self._request(
+            "POST",
+            settings.crm_event_batch_path,
+            json=payload,
+            max_attempts=3,
+        )
+
     async def check_status(self, crm_request_id: str) -> dict:
         payload = {"crm_request_id": crm_request_id}
         data = await self._request(
@@ -217,9 +262,56 @@ class CRMClientHTTP:
             return data
         raise CRMPermanentError("unexpected status format")
 
+    @property
+    def supports_bulk_status(self) -> bool:
+        return bool(settings.crm_status_bulk_path)
 
-def get_crm_client():
+    async def check_statuses(self, crm_request_ids: list[str]) -> dict[str, dict]:
+        payload = {"crm_request_ids": [str(i) for i in crm_request_ids]}
+        data = await self._request(
+            "POST",
+            settings.crm_status_bulk_path,
+            json=payload,
+            max_attempts=3,
+        )
+        if isinstance(data, dict) and isinstance(data.get("statuses"), (list, dict)):
+            data = data["statuses"]
+
+        if isinstance(data, dict):
+            return {str(k): v for k, v in data.items() if isinstance(v, dict)}
+        if isinstance(data, list):
+            result: dict[str, dict] = {}
+            for item in data:
+                if isinstance(item, dict) and (item.get("crm_request_id") or item.get("id")):
+                    result[str(item.get("crm_request_id") or item.get("id"))] = item
+            return result
+        raise CRMPermanentError("unexpected bulk status format")
+
+
+_crm_client: CRMClientMock | CRMClientHTTP | None = None
+
+
+def _build_crm_client() -> CRMClientMock | CRMClientHTTP:
     mode = (settings.crm_mode or "mock").strip().lower()
     if mode == "mock":
         return CRMClientMock()
-    return CRMClientHTTP()
\ No newline at end of file
+    return CRMClientHTTP()
+
+
+def init_crm_client() -> CRMClientMock | CRMClientHTTP:
+    global _crm_client
+    if _crm_client is None:
+        _crm_client = _build_crm_client()
+        log.info("crm client initialised: %s", type(_crm_client).__name__)
+    return _crm_client
+
+
+def get_crm_client() -> CRMClientMock | CRMClientHTTP:
+    # один клиент на процесс: на нём живут пул соединений и состояние mock-а
+    return _crm_client if _crm_client is not None else init_crm_client()
+
+
+async def close_crm_client() -> None:
+    global _crm_client
+    _crm_client = None
+    await close_http_client()
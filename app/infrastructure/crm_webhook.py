@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import logging
+from datetime import datetime
+
+from aiohttp import web
+
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.repositories.requests import RequestRepository
+from app.services.crm_status import normalize_status
+
+log = logging.getLogger("crm")
+
+
+class CRMStatusWebhook:
+    def build_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(settings.crm_webhook_path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if settings.crm_webhook_secret:
+            got = request.headers.get(settings.crm_webhook_secret_header) or ""
+            if not hmac.compare_digest(got, settings.crm_webhook_secret):
+                return web.json_response({"error": "unauthorized"}, status=401)
+
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return web.json_response({"error": "invalid json"}, status=400)
+
+        if isinstance(data, dict):
+            items = data.get("statuses") if isinstance(data.get("statuses"), list) else [data]
+        elif isinstance(data, list):
+            items = data
+        else:
+            return web.json_response({"error": "invalid payload"}, status=400)
+
+        by_crm: dict[str, str] = {}
+        by_client: dict[str, str] = {}
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            status = normalize_status(item)
+            if status is None:
+                continue
+            if item.get("crm_request_id"):
+                by_crm[str(item["crm_request_id"])] = status
+            elif item.get("client_request_id"):
+                by_client[str(item["client_request_id"])] = status
+
+        now = datetime.utcnow()
+        async with AsyncSessionLocal() as session:
+            repo = RequestRepository(session)
+            updated = await repo.set_statuses(by_crm, synced_at=now)
+            updated += await repo.set_statuses(by_client, synced_at=now, by_client_request_id=True)
+            await repo.save()
+
+        log.info("crm status webhook: received=%s updated=%s", len(by_crm) + len(by_client), updated)
+        return web.json_response({"updated": updated})
+
+
+async def run_crm_webhook() -> None:
+    if not settings.crm_webhook_port:
+        return
+    if not settings.crm_webhook_secret:
+        log.warning("crm_webhook_secret is empty, status webhook accepts unauthenticated requests")
+
+    runner = web.AppRunner(CRMStatusWebhook().build_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, settings.crm_webhook_host, settings.crm_webhook_port)
+    await site.start()
+    log.info(
+        "crm status webhook listening on %s:%s%s",
+        settings.crm_webhook_host,
+        settings.crm_webhook_port,
+        settings.crm_webhook_path,
+    )
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
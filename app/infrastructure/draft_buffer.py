@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import bindparam, event, inspect, or_, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import flag_modified, set_committed_value
+
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.models import Draft
+
+log = logging.getLogger("drafts")
+
+# только прогресс анкеты: поля, которые читают дожимы и подтверждение (step6_at, nudge*, quote_*),
+# всегда пишутся сразу
+STAGED_FIELDS = frozenset({"direction", "give_amount", "office_id", "desired_date", "username", "last_step", "updated_at"})
+
+
+def _update_stmt(fields: tuple[str, ...]):
+    table = Draft.__table__
+    # отставшая запись не перетирает коммит, который прошёл позже неё (updated_at новее)
+    return (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .where(or_(table.c.updated_at.is_(None), table.c.updated_at <= bindparam("b_staged_at")))
+        .values({field: bindparam(f"b_{field}") for field in fields})
+    )
+
+
+class DraftBuffer:
+    def __init__(self, *, flush_seconds: float) -> None:
+        self._flush_seconds = max(0.1, float(flush_seconds))
+        self._pending: dict[int, dict[str, Any]] = {}
+        # снятые на запись, но ещё не закоммиченные — по владельцу (сессия хендлера или сам буфер).
+        # Их видят чтения и коммиты хендлеров; после отката они возвращаются в _pending
+        self._inflight: dict[object, dict[int, dict[str, Any]]] = {}
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def size(self) -> int:
+        return len(self._pending)
+
+    def has_staged(self) -> bool:
+        return bool(self._pending) or any(self._inflight.values())
+
+    def stage(self, draft: Draft, values: dict[str, Any]) -> None:
+        unknown = set(values) - STAGED_FIELDS
+        if unknown:
+            raise ValueError(f"draft fields can't be buffered: {', '.join(sorted(unknown))}")
+        # как будто уже записано: ORM не шлёт UPDATE, пока поле не поменяют снова
+        for field, value in values.items():
+            set_committed_value(draft, field, value)
+        self._pending.setdefault(draft.id, {}).update(values)
+
+    def overlay(self, draft: Draft) -> None:
+        for field, value in self._staged(draft.id).items():
+            set_committed_value(draft, field, value)
+
+    def take(self, draft_id: int, owner: object) -> dict[str, Any]:
+        taken = self._inflight.setdefault(owner, {})
+        # autoflush в той же транзакции: уже забранное повторно не накатываем поверх правок хендлера
+        if draft_id in taken:
+            return {}
+        values = self._staged(draft_id)
+        taken[draft_id] = self._pending.pop(draft_id, {})
+        return values
+
+    def committed(self, owner: object) -> None:
+        self._inflight.pop(owner, None)
+
+    def rolled_back(self, owner: object) -> None:
+        # транзакция не дошла до коммита — забранное снова ждёт записи, более новые значения поверх
+        for draft_id, values in (self._inflight.pop(owner, None) or {}).items():
+            if values:
+                self._pending[draft_id] = {**values, **self._pending.get(draft_id, {})}
+
+    def _staged(self, draft_id: int) -> dict[str, Any]:
+        values: dict[str, Any] = {}
+        for taken in self._inflight.values():
+            values.update(taken.get(draft_id) or {})
+        values.update(self._pending.get(draft_id) or {})
+        return values
+
+    async def flush(self) -> int:
+        async with self._lock:
+            if not self._pending:
+                return 0
+            batch, self._pending = self._pending, {}
+            self._inflight[self] = batch
+            try:
+                # одна executemany на набор полей, один коммит на всю пачку
+                groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+                for draft_id, values in batch.items():
+                    params = {f"b_{field}": value for field, value in values.items()}
+                    params.update(b_id=draft_id, b_staged_at=values["updated_at"])
+                    groups.setdefault(tuple(sorted(values)), []).append(params)
+
+                async with AsyncSessionLocal() as session:
+                    for fields, params in groups.items():
+                        await session.execute(_update_stmt(fields), params)
+                    await session.commit()
+            except BaseException:
+                self.rolled_back(self)
+                raise
+            self.committed(self)
+            return len(batch)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_seconds)
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("draft buffer flush failed, %s drafts kept in memory", self.size)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            log.exception("draft buffer final flush failed, %s drafts lost", self.size)
+
+
+def _merge_staged(session: Session, flush_context, instances) -> None:
+    # коммит, который трогает черновик, забирает его отложенные поля с собой:
+    # дожимы, сводка и подтверждение всегда видят в БД полную анкету
+    buffer = _buffer
+    if buffer is None or not buffer.has_staged():
+        return
+    for obj in session.dirty:
+        if not isinstance(obj, Draft) or obj.id is None:
+            continue
+        values = buffer.take(obj.id, session)
+        if not values:
+            continue
+        state = inspect(obj)
+        for field, value in values.items():
+            # выставленное в этом обновлении новее буфера
+            if state.attrs[field].history.has_changes():
+                continue
+            setattr(obj, field, value)
+            flag_modified(obj, field)
+        obj.updated_at = datetime.utcnow()
+
+
+def _after_commit(session: Session) -> None:
+    if _buffer is not None:
+        _buffer.committed(session)
+
+
+def _after_rollback(session: Session, *args) -> None:
+    if _buffer is not None:
+        _buffer.rolled_back(session)
+
+
+def _after_transaction_end(session: Session, transaction) -> None:
+    # close() без commit/rollback тоже откатывает: забранное не должно потеряться
+    if transaction.parent is None and _buffer is not None:
+        _buffer.rolled_back(session)
+
+
+_HOOKS = [
+    ("before_flush", _merge_staged),
+    ("after_commit", _after_commit),
+    ("after_rollback", _after_rollback),
+    ("after_soft_rollback", _after_rollback),
+    ("after_transaction_end", _after_transaction_end),
+]
+
+
+def _listen() -> None:
+    for name, hook in _HOOKS:
+        event.listen(Session, name, hook)
+
+
+def _unlisten() -> None:
+    for name, hook in _HOOKS:
+        event.remove(Session, name, hook)
+
+
+_buffer: DraftBuffer | None = None
+
+
+def init_draft_buffer() -> DraftBuffer | None:
+    global _buffer
+    if not settings.draft_buffer_enabled:
+        return None
+    if _buffer is None:
+        _buffer = DraftBuffer(flush_seconds=settings.draft_buffer_flush_seconds)
+        _listen()
+        _buffer.start()
+        log.info("draft buffer enabled, flush every %ss", settings.draft_buffer_flush_seconds)
+    return _buffer
+
+
+def get_draft_buffer() -> DraftBuffer | None:
+    # буфер на процесс; None — пишем сразу (выключен или процесс его не поднимал: воркер, VK)
+    return _buffer
+
+
+async def close_draft_buffer() -> None:
+    global _buffer
+    if _buffer is None:
+        return
+    await _buffer.close()
+    _unlisten()
+    _buffer = None
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+import logging
+
+import httpx
+
+from app.config import settings
+
+log = logging.getLogger("http")
+
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_enabled() -> bool:
+    if not settings.crm_http2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        log.warning("crm_http2 is on but the h2 package is not installed, using HTTP/1.1")
+        return False
+    return True
+
+
+def get_http_client() -> httpx.AsyncClient:
+    # один пул соединений на процесс, чтобы не платить за TCP/TLS handshake на каждый вызов CRM
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            timeout=float(settings.crm_timeout),
+            limits=httpx.Limits(
+                max_connections=int(settings.crm_http_max_connections),
+                max_keepalive_connections=int(settings.crm_http_max_keepalive),
+                keepalive_expiry=float(settings.crm_http_keepalive_seconds),
+            ),
+            http2=_http2_enabled(),
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        client, _client = _client, None
+        await client.aclose()
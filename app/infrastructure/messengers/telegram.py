@@ -1,5 +1,63 @@
 from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError, TelegramRetryAfter
+from aiogram.methods import (
+    CopyMessage,
+    EditMessageReplyMarkup,
+    EditMessageText,
+    ForwardMessage,
+    SendDocument,
+    SendMessage,
+    SendPhoto,
+    TelegramMethod,
+)
+
 from app.infrastructure.messenger import Messenger
+from app.infrastructure.outbound import OutboundScheduler, get_outbound_scheduler
+
+_THROTTLED_METHODS = (
+    SendMessage,
+    SendPhoto,
+    SendDocument,
+    CopyMessage,
+    ForwardMessage,
+    EditMessageText,
+    EditMessageReplyMarkup,
+)
+
+
+_PERMANENT_BAD_REQUESTS = ("chat not found", "user not found", "user is deactivated", "peer_id_invalid")
+
+
+def _retry_after(e: BaseException):
+    if isinstance(e, TelegramRetryAfter):
+        return float(e.retry_after)
+    return None
+
+
+def telegram_permanent_error(e: BaseException) -> bool:
+    # бот заблокирован / чат удалён — повторять бессмысленно
+    if isinstance(e, TelegramForbiddenError):
+        return True
+    if isinstance(e, TelegramBadRequest):
+        return any(m in str(e.message).lower() for m in _PERMANENT_BAD_REQUESTS)
+    return False
+
+
+class OutboundThrottleMiddleware(BaseRequestMiddleware):
+    def __init__(self, scheduler: OutboundScheduler | None = None) -> None:
+        self._scheduler = scheduler or get_outbound_scheduler("tg")
+
+    async def __call__(self, make_request: NextRequestMiddlewareType, bot: Bot, method: TelegramMethod):
+        chat_id = getattr(method, "chat_id", None)
+        if not isinstance(method, _THROTTLED_METHODS) or not isinstance(chat_id, int):
+            return await make_request(bot, method)
+
+        return await self._scheduler.send(
+            chat_id,
+            lambda: make_request(bot, method),
+            retry_after=_retry_after,
+        )
 
 
 class TelegramMessenger(Messenger):
@@ -7,4 +65,4 @@ class TelegramMessenger(Messenger):
         self._bot = bot
 
     async def send_text(self, peer_id: int, text: str) -> None:
-        await self._bot.send_message(chat_id=peer_id, text=text)
\ No newline at end of file
+        await self._bot.send_message(chat_id=peer_id, text=text)
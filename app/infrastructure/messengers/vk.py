@@ -1,17 +1,35 @@
 import asyncio
 import vk_api
 from app.infrastructure.messenger import Messenger
+from app.infrastructure.outbound import get_outbound_scheduler
+
+
+def vk_retry_after(e: BaseException):
+    # 6 - слишком много запросов в секунду
+    if isinstance(e, vk_api.exceptions.ApiError) and getattr(e, "code", None) == 6:
+        return 1.0
+    return None
+
+
+def vk_permanent_error(e: BaseException) -> bool:
+    # 7 - нет прав, 900 - пользователь в чёрном списке, 901 - нет разрешения на сообщения, 902 - настройки приватности
+    return isinstance(e, vk_api.exceptions.ApiError) and getattr(e, "code", None) in (7, 900, 901, 902)
 
 
 class VKMessenger(Messenger):
     def __init__(self, token: str):
         self._session = vk_api.VkApi(token=token)
         self._api = self._session.get_api()
+        self._outbound = get_outbound_scheduler("vk")
 
     async def send_text(self, peer_id: int, text: str) -> None:
-        await asyncio.to_thread(
-            self._api.messages.send,
-            peer_id=peer_id,
-            random_id=0,
-            message=text,
-        )
\ No newline at end of file
+        await self._outbound.send(
+            peer_id,
+            lambda: asyncio.to_thread(
+                self._api.messages.send,
+                peer_id=peer_id,
+                random_id=0,
+                message=text,
+            ),
+            retry_after=vk_retry_after,
+        )
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Optional, TypeVar
+
+from app.config import settings
+
+log = logging.getLogger("outbound")
+
+T = TypeVar("T")
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = max(float(rate), 0.001)
+        self.capacity = max(float(capacity), 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def take(self, now: float) -> float:
+        self._refill(now)
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return 0.0
+        return (1.0 - self._tokens) / self.rate
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self._tokens >= self.capacity
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.rate
+
+
+class OutboundScheduler:
+    def __init__(
+        self,
+        *,
+        global_rate: float,
+        peer_rate: float,
+        peer_burst: int = 1,
+        max_retries: int = 3,
+        max_peers: int = 10000,
+    ) -> None:
+        self._global = TokenBucket(global_rate, global_rate)
+        self._peer_rate = peer_rate
+        self._peer_burst = peer_burst
+        self._peers: dict[int, TokenBucket] = {}
+        self._paused_until = 0.0
+        self._peer_paused_until: dict[int, float] = {}
+        self._max_retries = max_retries
+        self._max_peers = max_peers
+
+    def pause(self, seconds: float, *, peer_id: Optional[int] = None) -> None:
+        until = time.monotonic() + max(float(seconds), 0.0)
+        if peer_id is None:
+            self._paused_until = max(self._paused_until, until)
+            return
+        self._peer_paused_until[peer_id] = max(self._peer_paused_until.get(peer_id, 0.0), until)
+
+    async def acquire(self, peer_id: int) -> None:
+        await self._acquire_peer(peer_id)
+        await self._acquire_global()
+
+    async def send(
+        self,
+        peer_id: int,
+        call: Callable[[], Awaitable[T]],
+        *,
+        retry_after: Optional[Callable[[BaseException], Optional[float]]] = None,
+    ) -> T:
+        attempt = 0
+        while True:
+            await self.acquire(peer_id)
+            try:
+                return await call()
+            except Exception as e:
+                delay = retry_after(e) if retry_after is not None else None
+                if delay is None or attempt >= self._max_retries:
+                    raise
+                attempt += 1
+                log.warning("outbound throttled: peer_id=%s retry_after=%.1fs attempt=%s", peer_id, delay, attempt)
+                self.pause(delay)
+                self.pause(delay, peer_id=peer_id)
+
+    async def _acquire_peer(self, peer_id: int) -> None:
+        while True:
+            now = time.monotonic()
+            delay = self._peer_paused_until.get(peer_id, 0.0) - now
+            if delay <= 0:
+                self._peer_paused_until.pop(peer_id, None)
+                bucket = self._peers.get(peer_id)
+                if bucket is None:
+                    self._prune_peers(now)
+                    bucket = self._peers[peer_id] = TokenBucket(self._peer_rate, self._peer_burst)
+                delay = bucket.take(now)
+                if delay <= 0:
+                    return
+            await asyncio.sleep(delay)
+
+    async def _acquire_global(self) -> None:
+        while True:
+            now = time.monotonic()
+            delay = self._paused_until - now
+            if delay <= 0:
+                delay = self._global.take(now)
+                if delay <= 0:
+                    return
+            await asyncio.sleep(delay)
+
+    def _prune_peers(self, now: float) -> None:
+        if len(self._peers) < self._max_peers:
+            return
+        for peer_id in [p for p, b in self._peers.items() if b.idle(now)]:
+            del self._peers[peer_id]
+
+
+_schedulers: dict[str, OutboundScheduler] = {}
+
+# бот и воркер шлют от одного токена/сообщества, лимит мессенджера делится между процессами
+ROLE_BOT = "bot"
+ROLE_WORKER = "worker"
+_role = ROLE_BOT
+
+
+def set_outbound_role(role: str) -> None:
+    global _role
+    if role not in (ROLE_BOT, ROLE_WORKER):
+        raise ValueError(f"unsupported outbound role: {role}")
+    if _schedulers:
+        raise RuntimeError("outbound role must be set before the first send")
+    _role = role
+
+
+def get_outbound_scheduler(transport: str) -> OutboundScheduler:
+    scheduler = _schedulers.get(transport)
+    if scheduler is not None:
+        return scheduler
+
+    if transport == "tg":
+        scheduler = OutboundScheduler(
+            global_rate=settings.tg_outbound_worker_rate if _role == ROLE_WORKER else settings.tg_outbound_global_rate,
+            peer_rate=settings.tg_outbound_peer_rate,
+            peer_burst=settings.tg_outbound_peer_burst,
+            max_retries=settings.outbound_max_retries,
+        )
+    elif transport == "vk":
+        scheduler = OutboundScheduler(
+            global_rate=settings.vk_outbound_worker_rate if _role == ROLE_WORKER else settings.vk_outbound_global_rate,
+            peer_rate=settings.vk_outbound_peer_rate,
+            peer_burst=settings.vk_outbound_peer_burst,
+            max_retries=settings.outbound_max_retries,
+        )
+    else:
+        raise ValueError(f"unsupported transport: {transport}")
+
+    _schedulers[transport] = scheduler
+    return scheduler
@@ -2,26 +2,173 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
+from datetime import datetime
 
 from aiogram import Bot
 
 from app.config import settings
+from app.db import connect_listener
+from app.repositories.nudge_jobs import NUDGE_JOBS_CHANNEL
+from app.repositories.outbox import OUTBOX_CHANNEL
+from app.services.crm_sync import CRMStatusSync
 from app.services.nudges import NudgeService
+from app.services.outbox import OutboxDispatcher
 
 log = logging.getLogger("nudges")
 
 
-async def run_nudge_worker(bot: Bot, *, vk_sender=None) -> None:
+class _Wakeup:
+    def __init__(self, channel: str) -> None:
+        self.channel = channel
+        self.event = asyncio.Event()
+        self._conn = None
+
+    @property
+    def listening(self) -> bool:
+        return self._conn is not None and not self._conn.is_closed()
+
+    async def ensure_listening(self) -> None:
+        if self.listening:
+            return
+        try:
+            self._conn = await connect_listener(self.channel, self._on_notify)
+            self._conn.add_termination_listener(self._on_terminated)
+            log.info("listening on %s", self.channel)
+        except Exception:
+            self._conn = None
+            log.exception("LISTEN %s failed, falling back to polling", self.channel)
+
+    def _on_notify(self, conn, pid, channel, payload) -> None:
+        self.event.set()
+
+    def _on_terminated(self, conn) -> None:
+        log.warning("LISTEN %s connection closed", self.channel)
+        self._conn = None
+
+    async def wait(self, timeout: float) -> None:
+        try:
+            await asyncio.wait_for(self.event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _drain(service: NudgeService) -> None:
+    pause = float(settings.nudge_drain_pause_seconds)
+    max_seconds = float(settings.nudge_drain_max_seconds)
+    report_every = max(1, int(settings.nudge_drain_report_every))
+
+    started = time.monotonic()
+    backlog = await service.backlog()
+    log.info("nudge backlog detected, draining: worker_id=%s due=%s", service.worker_id, backlog)
+
+    batches = 0
+    finished = 0
+    while True:
+        await asyncio.sleep(pause)
+        stats = await service.tick()
+        batches += 1
+        finished += stats.finished
+
+        if stats.claimed < service.batch_size:
+            reason = "empty"
+            break
+        if stats.finished == 0:
+            # вся пачка упала — не крутим её по кругу, дальше обычный цикл
+            reason = "no_progress"
+            break
+        if time.monotonic() - started >= max_seconds:
+            reason = "time_limit"
+            break
+        if batches % report_every == 0:
+            log.info(
+                "nudge drain progress: batches=%s finished=%s due=%s",
+                batches,
+                finished,
+                await service.backlog(),
+            )
+
+    log.info(
+        "nudge drain stopped: reason=%s batches=%s finished=%s elapsed=%.1fs due=%s",
+        reason,
+        batches,
+        finished,
+        time.monotonic() - started,
+        await service.backlog(),
+    )
+
+
+async def _sleep_until_due(wakeup: _Wakeup, next_due_at, *, interval: float) -> None:
+    max_sleep = float(settings.nudge_worker_max_sleep_seconds)
+    min_sleep = float(settings.nudge_worker_min_sleep_seconds)
+
+    # без LISTEN ничего не узнаем о новых записях, поэтому спим не дольше interval
+    delay = max_sleep if wakeup.listening else interval
+    try:
+        next_due = await next_due_at()
+    except Exception:
+        log.exception("next due lookup failed")
+        next_due = None
+    if next_due is not None:
+        delay = min(delay, (next_due - datetime.utcnow()).total_seconds())
+
+    await wakeup.wait(max(delay, min_sleep))
+
+
+async def run_nudge_worker() -> None:
     interval = int(getattr(settings, "nudge_worker_interval_seconds", 60))
 
-    service = NudgeService(bot, vk_sender=vk_sender)
+    service = NudgeService()
+    wakeup = _Wakeup(NUDGE_JOBS_CHANNEL)
 
-    log.info("nudge worker started, interval=%s", interval)
+    log.info("nudge worker started, worker_id=%s interval=%s", service.worker_id, interval)
 
     while True:
+        await wakeup.ensure_listening()
+        wakeup.event.clear()
+
         try:
-            await service.tick()
+            stats = await service.tick()
+            if stats.claimed >= service.batch_size:
+                await _drain(service)
         except Exception:
             log.exception("nudge loop failed")
 
-        await asyncio.sleep(interval)
\ No newline at end of file
+        await _sleep_until_due(wakeup, service.next_due_at, interval=float(interval))
+
+
+async def run_outbox_dispatcher(bot: Bot, *, vk_sender=None) -> None:
+    interval = int(getattr(settings, "nudge_worker_interval_seconds", 60))
+
+    dispatcher = OutboxDispatcher(bot, vk_sender=vk_sender)
+    wakeup = _Wakeup(OUTBOX_CHANNEL)
+
+    log.info("outbox dispatcher started, worker_id=%s", dispatcher.worker_id)
+
+    while True:
+        await wakeup.ensure_listening()
+        wakeup.event.clear()
+
+        try:
+            while await dispatcher.tick() >= dispatcher.batch_size:
+                await asyncio.sleep(float(settings.nudge_drain_pause_seconds))
+        except Exception:
+            log.exception("outbox loop failed")
+
+        await _sleep_until_due(wakeup, dispatcher.next_due_at, interval=float(interval))
+
+
+async def run_crm_status_sync() -> None:
+    interval = int(settings.crm_sync_interval_seconds)
+    if interval <= 0:
+        return
+
+    sync = CRMStatusSync()
+    log.info("crm status sync started, interval=%s", interval)
+
+    while True:
+        try:
+            await sync.run_once()
+        except Exception:
+            log.exception("crm status sync failed")
+        await asyncio.sleep(interval)
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+from app.db import engine
+from app.models import Base
+
+log = logging.getLogger("migrations")
+
+# все процессы (бот, VK, воркер, CLI) мигрируют по очереди
+MIGRATIONS_LOCK_ID = 0x6D696772
+
+# nudgeN_planned_at колонки больше не пишутся, запланированные до перехода на nudge_jobs дожимы переносим
+LEGACY_NUDGE_COLUMNS = [
+    ("nudge1", "requests"),
+    ("nudge2", "drafts"),
+    ("nudge3", "drafts"),
+    ("nudge4", "drafts"),
+    ("nudge5", "requests"),
+    ("nudge6", "requests"),
+    ("nudge7", "requests"),
+]
+
+# колонки, которые раньше добавлялись ALTER'ами на каждом старте; на свежей базе их уже создал create_all
+_LEGACY_COLUMNS = {
+    "drafts": [
+        ("nudge2_planned_at", "TIMESTAMP"),
+        ("step6_at", "TIMESTAMP"),
+        ("nudge3_planned_at", "TIMESTAMP"),
+        ("nudge2_answered_at", "TIMESTAMP"),
+        ("nudge4_planned_at", "TIMESTAMP"),
+        ("nudge2_sent_at", "TIMESTAMP"),
+        ("nudge2_answer", "VARCHAR(32)"),
+        ("nudge3_sent_at", "TIMESTAMP"),
+        ("nudge3_answer", "VARCHAR(32)"),
+        ("nudge3_answered_at", "TIMESTAMP"),
+        ("nudge4_sent_at", "TIMESTAMP"),
+        ("nudge4_answer", "VARCHAR(32)"),
+        ("nudge4_answered_at", "TIMESTAMP"),
+        ("quote_rate", "DOUBLE PRECISION"),
+        ("quote_receive_amount", "DOUBLE PRECISION"),
+        ("quote_summary_text", "TEXT"),
+        ("quote_key", "VARCHAR(128)"),
+        ("quote_expires_at", "TIMESTAMP"),
+    ],
+    "requests": [
+        ("nudge1_planned_at", "TIMESTAMP"),
+        ("nudge1_sent_at", "TIMESTAMP"),
+        ("nudge1_answer", "VARCHAR(32)"),
+        ("nudge5_planned_at", "TIMESTAMP"),
+        ("nudge5_sent_at", "TIMESTAMP"),
+        ("nudge5_answer", "VARCHAR(32)"),
+        ("nudge5_answered_at", "TIMESTAMP"),
+        ("nudge6_planned_at", "TIMESTAMP"),
+        ("nudge6_sent_at", "TIMESTAMP"),
+        ("nudge6_answer", "VARCHAR(32)"),
+        ("nudge6_answered_at", "TIMESTAMP"),
+        ("nudge7_planned_at", "TIMESTAMP"),
+        ("nudge7_sent_at", "TIMESTAMP"),
+        ("nudge7_answer", "VARCHAR(32)"),
+        ("nudge7_answered_at", "TIMESTAMP"),
+        ("status_synced_at", "TIMESTAMP"),
+    ],
+    "nudge_jobs": [
+        ("lease_owner", "VARCHAR(64)"),
+        ("lease_expires_at", "TIMESTAMP"),
+    ],
+}
+
+
+async def _baseline(conn: AsyncConnection) -> None:
+    await conn.run_sync(Base.metadata.create_all)
+
+    # одна ALTER TABLE на таблицу — один ACCESS EXCLUSIVE вместо десятка
+    for table, columns in _LEGACY_COLUMNS.items():
+        clauses = ",\n".join(f"ADD COLUMN IF NOT EXISTS {name} {type_} NULL" for name, type_ in columns)
+        await conn.execute(text(f"ALTER TABLE {table}\n{clauses}"))
+
+    for kind, table in LEGACY_NUDGE_COLUMNS:
+        await conn.execute(text(f"""
+            INSERT INTO nudge_jobs (kind, target_id, transport, peer_id, due_at, state, attempts, created_at, updated_at)
+            SELECT '{kind}', id, transport, peer_id, {kind}_planned_at, 'pending', 0,
+                   now() AT TIME ZONE 'utc', now() AT TIME ZONE 'utc'
+            FROM {table}
+            WHERE {kind}_planned_at IS NOT NULL
+              AND {kind}_sent_at IS NULL
+              AND {kind}_answer IS NULL
+            ON CONFLICT ON CONSTRAINT uq_nudge_jobs_kind_target_id DO NOTHING
+        """))
+
+
+_INDEX_PACK_CREATE = [
+    ("ix_requests_telegram_user_id_id", "requests (telegram_user_id, id) WHERE telegram_user_id IS NOT NULL"),
+    ("ix_requests_crm_request_id", "requests (crm_request_id) WHERE crm_request_id IS NOT NULL"),
+    ("ix_nudge_jobs_pending_due_at", "nudge_jobs (due_at) WHERE state = 'pending'"),
+    (
+        "ix_nudge_jobs_pending_lease",
+        "nudge_jobs (lease_expires_at) WHERE state = 'pending' AND lease_expires_at IS NOT NULL",
+    ),
+    ("ix_nudge_jobs_dead_updated_at", "nudge_jobs (updated_at) WHERE state = 'dead'"),
+    ("ix_outbox_pending_next_attempt_at", "outbox (next_attempt_at, id) WHERE state = 'pending'"),
+    ("ix_outbox_pending_lease", "outbox (lease_expires_at) WHERE state = 'pending' AND lease_expires_at IS NOT NULL"),
+    ("ix_outbox_dead_id", "outbox (id) WHERE state = 'dead'"),
+]
+
+# заменены частичными/составными выше или покрыты uq_drafts_transport_peer_id;
+# по drafts.telegram_user_id хендлеры больше не ищут — черновик берётся по (transport, peer_id)
+_INDEX_PACK_DROP = [
+    "ix_drafts_telegram_user_id",
+    "ix_requests_telegram_user_id",
+    "ix_nudge_jobs_state_due_at",
+    "ix_outbox_state_next_attempt_at",
+    "ix_drafts_transport",
+    "ix_requests_transport",
+]
+
+
+async def _create_index_concurrently(conn: AsyncConnection, name: str, definition: str) -> None:
+    # прерванный CONCURRENTLY оставляет невалидный индекс, и IF NOT EXISTS его бы пропустил
+    invalid = await conn.scalar(
+        text("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"),
+        {"name": name},
+    )
+    if invalid:
+        log.warning("dropping invalid index %s left by an interrupted build", name)
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {definition}"))
+
+
+async def _drop_index_concurrently(conn: AsyncConnection, name: str) -> None:
+    await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+
+
+async def _index_pack(conn: AsyncConnection) -> None:
+    for name, definition in _INDEX_PACK_CREATE:
+        await _create_index_concurrently(conn, name, definition)
+    for name in _INDEX_PACK_DROP:
+        await _drop_index_concurrently(conn, name)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    apply: Callable[[AsyncConnection], Awaitable[None]]
+    # CREATE/DROP INDEX CONCURRENTLY не работают в транзакции: такие миграции идут на отдельном
+    # autocommit-соединении и должны быть идемпотентны — после сбоя их просто запускают снова
+    transactional: bool = True
+
+
+# только дописывать в конец. baseline создаёт таблицы по текущим моделям,
+# поэтому новые колонки и индексы добавляем с IF NOT EXISTS
+MIGRATIONS: list[Migration] = [
+    Migration(1, "baseline", _baseline),
+    Migration(2, "index_pack", _index_pack, transactional=False),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+async def _read_version(conn: AsyncConnection) -> int:
+    if await conn.scalar(text("SELECT to_regclass('schema_version')")) is None:
+        return 0
+    return int(await conn.scalar(text("SELECT coalesce(max(version), 0) FROM schema_version")) or 0)
+
+
+async def current_version() -> int:
+    async with engine.connect() as conn:
+        return await _read_version(conn)
+
+
+async def migrate() -> int:
+    # быстрый путь: схема актуальна — один SELECT, без блокировок таблиц
+    version = await current_version()
+    if version >= LATEST_VERSION:
+        return version
+
+    async with engine.connect() as conn:
+        # не блокирующий pg_advisory_lock: ждущий в нём процесс держит снимок,
+        # и CREATE INDEX CONCURRENTLY мигрирующего ждал бы его — взаимная блокировка
+        while True:
+            locked = await conn.scalar(select(func.pg_try_advisory_lock(MIGRATIONS_LOCK_ID)))
+            await conn.commit()
+            if locked:
+                break
+            await asyncio.sleep(1.0)
+        try:
+            await conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(128) NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc')
+                )
+            """))
+            await conn.commit()
+
+            # пока ждали блокировку, схему мог обновить другой процесс
+            version = await _read_version(conn)
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                log.info("applying migration %s_%s", migration.version, migration.name)
+                if migration.transactional:
+                    await migration.apply(conn)
+                else:
+                    # CONCURRENTLY ждёт все открытые транзакции, включая нашу же на conn
+                    await conn.commit()
+                    async with engine.connect() as ddl_conn:
+                        ddl_conn = await ddl_conn.execution_options(isolation_level="AUTOCOMMIT")
+                        await migration.apply(ddl_conn)
+                await conn.execute(
+                    text("INSERT INTO schema_version (version, name) VALUES (:version, :name)"),
+                    {"version": migration.version, "name": migration.name},
+                )
+                await conn.commit()
+                version = migration.version
+        finally:
+            await conn.rollback()
+            await conn.execute(select(func.pg_advisory_unlock(MIGRATIONS_LOCK_ID)))
+            await conn.commit()
+
+    log.info("schema is at version %s", version)
+    return version
+
+
+async def ensure_schema() -> None:
+    if settings.DB_AUTO_CREATE:
+        await migrate()
+        return
+
+    version = await current_version()
+    if version < LATEST_VERSION:
+        log.error("schema is at version %s, expected %s: run python -m app.migrations", version, LATEST_VERSION)
+
+
+async def _cli(check: bool) -> int:
+    try:
+        if check:
+            version = await current_version()
+            print(f"schema version {version}, latest {LATEST_VERSION}")
+            return 0 if version >= LATEST_VERSION else 1
+        await migrate()
+        return 0
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--check", action="store_true", help="только проверить версию схемы, код 1 — нужна миграция")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL)
+    raise SystemExit(asyncio.run(_cli(args.check)))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,10 +10,13 @@ from sqlalchemy import (
     DateTime,
     Enum,
     Float,
+    Index,
     Integer,
+    JSON,
     String,
     Text,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
@@ -32,10 +35,10 @@ class Draft(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
-    transport: Mapped[str] = mapped_column(String(16), default="tg", index=True)
+    transport: Mapped[str] = mapped_column(String(16), default="tg")
     peer_id: Mapped[int] = mapped_column(BigInteger, index=True)
 
-    telegram_user_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True, index=True)
+    telegram_user_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
 
     direction: Mapped[Optional[Direction]] = mapped_column(Enum(Direction), nullable=True)
     give_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
@@ -70,6 +73,12 @@ class Draft(Base):
 
     client_request_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
 
+    quote_rate: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    quote_receive_amount: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    quote_summary_text: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    quote_key: Mapped[Optional[str]] = mapped_column(String(128), nullable=True)
+    quote_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
     last_step: Mapped[str] = mapped_column(String(64), default="start")
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -84,10 +93,10 @@ class Request(Base):
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
 
-    transport: Mapped[str] = mapped_column(String(16), default="tg", index=True)
+    transport: Mapped[str] = mapped_column(String(16), default="tg")
     peer_id: Mapped[int] = mapped_column(BigInteger, index=True)
 
-    telegram_user_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True, index=True)
+    telegram_user_id: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
 
     client_request_id: Mapped[str] = mapped_column(String(64), unique=True, index=True)
     crm_request_id: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
@@ -103,6 +112,7 @@ class Request(Base):
 
     username: Mapped[str] = mapped_column(String(64))
     status: Mapped[str] = mapped_column(String(64), default="created")
+    status_synced_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
 
     summary_text: Mapped[str] = mapped_column(Text)
 
@@ -125,4 +135,80 @@ class Request(Base):
     nudge7_planned_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     nudge7_sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     nudge7_answer: Mapped[Optional[str]] = mapped_column(String(32), nullable=True)
-    nudge7_answered_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
\ No newline at end of file
+    nudge7_answered_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # последняя заявка пользователя: WHERE telegram_user_id = ? ORDER BY id DESC LIMIT 1
+        Index(
+            "ix_requests_telegram_user_id_id",
+            "telegram_user_id",
+            "id",
+            postgresql_where=text("telegram_user_id IS NOT NULL"),
+        ),
+        Index("ix_requests_crm_request_id", "crm_request_id", postgresql_where=text("crm_request_id IS NOT NULL")),
+    )
+
+
+class NudgeJob(Base):
+    __tablename__ = "nudge_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    kind: Mapped[str] = mapped_column(String(16))
+    target_id: Mapped[int] = mapped_column(Integer)
+
+    transport: Mapped[str] = mapped_column(String(16), default="tg")
+    peer_id: Mapped[int] = mapped_column(BigInteger)
+
+    due_at: Mapped[datetime] = mapped_column(DateTime)
+    state: Mapped[str] = mapped_column(String(16), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        UniqueConstraint("kind", "target_id", name="uq_nudge_jobs_kind_target_id"),
+        Index("ix_nudge_jobs_pending_due_at", "due_at", postgresql_where=text("state = 'pending'")),
+        Index(
+            "ix_nudge_jobs_pending_lease",
+            "lease_expires_at",
+            postgresql_where=text("state = 'pending' AND lease_expires_at IS NOT NULL"),
+        ),
+        Index("ix_nudge_jobs_dead_updated_at", "updated_at", postgresql_where=text("state = 'dead'")),
+    )
+
+
+class OutboxMessage(Base):
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+
+    kind: Mapped[str] = mapped_column(String(32))
+    payload: Mapped[dict] = mapped_column(JSON)
+    idempotency_key: Mapped[str] = mapped_column(String(128), unique=True)
+
+    state: Mapped[str] = mapped_column(String(16), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+
+    lease_owner: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
+    lease_expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+    sent_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # отправленные строки копятся, поэтому индексы только по живым состояниям
+        Index("ix_outbox_pending_next_attempt_at", "next_attempt_at", "id", postgresql_where=text("state = 'pending'")),
+        Index(
+            "ix_outbox_pending_lease",
+            "lease_expires_at",
+            postgresql_where=text("state = 'pending' AND lease_expires_at IS NOT NULL"),
+        ),
+        Index("ix_outbox_dead_id", "id", postgresql_where=text("state = 'dead'")),
+    )
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import dataclass
+
+import asyncpg
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class PlanCheck:
+    name: str
+    sql: str
+    args: str
+    index: str
+
+
+# запросы повторяют горячие пути хендлеров и воркеров; $N — как у asyncpg, состояние — литералом, как в репозиториях
+CHECKS = [
+    PlanCheck(
+        "draft by transport and peer (handlers, vk, repositories)",
+        "SELECT * FROM drafts WHERE transport = $1 AND peer_id = $2",
+        "'tg', 1",
+        "uq_drafts_transport_peer_id",
+    ),
+    PlanCheck(
+        "latest request by telegram user (nudge1)",
+        "SELECT * FROM requests WHERE telegram_user_id = $1 ORDER BY id DESC LIMIT 1",
+        "1",
+        "ix_requests_telegram_user_id_id",
+    ),
+    PlanCheck(
+        "request by client_request_id",
+        "SELECT * FROM requests WHERE client_request_id = $1",
+        "'x'",
+        "ix_requests_client_request_id",
+    ),
+    PlanCheck(
+        "requests by crm_request_id (webhook, status sync)",
+        "SELECT id FROM requests WHERE crm_request_id IN ($1, $2)",
+        "'a', 'b'",
+        "ix_requests_crm_request_id",
+    ),
+    PlanCheck(
+        "claim due nudge jobs",
+        "SELECT id FROM nudge_jobs WHERE state = 'pending' AND due_at <= $1 "
+        "AND (lease_expires_at IS NULL OR lease_expires_at <= $1) "
+        "ORDER BY due_at LIMIT $2 FOR UPDATE SKIP LOCKED",
+        "now() AT TIME ZONE 'utc', 50",
+        "ix_nudge_jobs_pending_due_at",
+    ),
+    PlanCheck(
+        "next nudge lease expiry",
+        "SELECT min(lease_expires_at) FROM nudge_jobs WHERE state = 'pending' AND lease_expires_at IS NOT NULL",
+        "",
+        "ix_nudge_jobs_pending_lease",
+    ),
+    PlanCheck(
+        "dead nudge jobs (admin)",
+        "SELECT * FROM nudge_jobs WHERE state = 'dead' ORDER BY updated_at DESC LIMIT $1",
+        "10",
+        "ix_nudge_jobs_dead_updated_at",
+    ),
+    PlanCheck(
+        "nudge job by kind and target",
+        "SELECT * FROM nudge_jobs WHERE kind = $1 AND target_id = $2",
+        "'nudge1', 1",
+        "uq_nudge_jobs_kind_target_id",
+    ),
+    PlanCheck(
+        "claim due outbox rows",
+        "SELECT id FROM outbox WHERE state = 'pending' AND next_attempt_at <= $1 "
+        "AND (lease_expires_at IS NULL OR lease_expires_at <= $1) "
+        "ORDER BY next_attempt_at, id LIMIT $2 FOR UPDATE SKIP LOCKED",
+        "now() AT TIME ZONE 'utc', 100",
+        "ix_outbox_pending_next_attempt_at",
+    ),
+    PlanCheck(
+        "next outbox lease expiry",
+        "SELECT min(lease_expires_at) FROM outbox WHERE state = 'pending' AND lease_expires_at IS NOT NULL",
+        "",
+        "ix_outbox_pending_lease",
+    ),
+    PlanCheck(
+        "dead outbox rows (admin)",
+        "SELECT * FROM outbox WHERE state = 'dead' ORDER BY id DESC LIMIT $1",
+        "10",
+        "ix_outbox_dead_id",
+    ),
+]
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans") or []:
+        yield from _walk(child)
+
+
+async def _explain(conn: asyncpg.Connection, check: PlanCheck) -> dict:
+    await conn.execute(f"PREPARE plan_check AS {check.sql}")
+    try:
+        execute = f"EXECUTE plan_check({check.args})" if check.args else "EXECUTE plan_check"
+        raw = await conn.fetchval(f"EXPLAIN (FORMAT JSON) {execute}")
+    finally:
+        await conn.execute("DEALLOCATE plan_check")
+    plan = json.loads(raw) if isinstance(raw, str) else raw
+    return plan[0]["Plan"]
+
+
+async def run(verbose: bool) -> int:
+    conn = await asyncpg.connect(
+        host=settings.DB_HOST,
+        port=settings.DB_PORT,
+        user=settings.DB_USER,
+        password=settings.DB_PASSWORD,
+        database=settings.DB_NAME,
+    )
+    failed = 0
+    try:
+        tx = conn.transaction()
+        await tx.start()
+        # generic plan — как у подготовленных запросов asyncpg; seqscan выключен,
+        # чтобы на маленькой dev-базе проверять, что индекс применим, а не что он дешевле
+        await conn.execute("SET LOCAL plan_cache_mode = force_generic_plan")
+        await conn.execute("SET LOCAL enable_seqscan = off")
+
+        for check in CHECKS:
+            plan = await _explain(conn, check)
+            nodes = list(_walk(plan))
+            indexes = {n.get("Index Name") for n in nodes if n.get("Index Name")}
+            seq_scans = [n.get("Relation Name") for n in nodes if n.get("Node Type") == "Seq Scan"]
+
+            ok = check.index in indexes and not seq_scans
+            failed += 0 if ok else 1
+            print(f"{'ok  ' if ok else 'FAIL'} {check.name}: {', '.join(sorted(indexes)) or '-'}")
+            if verbose or not ok:
+                print(json.dumps(plan, indent=2, ensure_ascii=False))
+
+        await tx.rollback()
+    finally:
+        await conn.close()
+
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Проверка, что горячие запросы идут по индексам")
+    parser.add_argument("-v", "--verbose", action="store_true", help="печатать планы всех запросов")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(run(args.verbose)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,65 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from datetime import datetime
+
+from sqlalchemy import Boolean, column, exists, false, func, inspect, select, true, union_all
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.infrastructure.draft_buffer import get_draft_buffer
 from app.models import Draft
 
+_UPSERTED = "draft_upserted"
+
+
+def _upsert(transport: str, peer_id: int, telegram_user_id: int | None, now: datetime, *, only_missing: bool = False):
+    stmt = insert(Draft).values(
+        transport=transport,
+        peer_id=peer_id,
+        telegram_user_id=telegram_user_id,
+        last_step="start",
+        created_at=now,
+        updated_at=now,
+    )
+    return stmt.on_conflict_do_update(
+        constraint="uq_drafts_transport_peer_id",
+        set_={"telegram_user_id": func.coalesce(Draft.telegram_user_id, stmt.excluded.telegram_user_id)},
+        # only_missing: уже заполненную строку не трогаем — без лишней версии строки
+        where=(Draft.telegram_user_id.is_(None) & stmt.excluded.telegram_user_id.is_not(None)) if only_missing else None,
+    )
+
+
+def _read_or_insert(transport: str, peer_id: int, telegram_user_id: int | None, now: datetime):
+    # строку, которую upsert не тронул, RETURNING не вернёт — её отдаёт второй SELECT того же запроса.
+    # Если строку только что вставил соседний запрос, снимку она не видна: тогда вернётся пусто.
+    # written — строку вставили или дописали telegram_user_id, её надо закоммитить
+    table = Draft.__table__
+    upserted = _upsert(transport, peer_id, telegram_user_id, now, only_missing=True).returning(*table.c).cte("upserted")
+    existing = select(*table.c, false().label("written")).where(
+        table.c.transport == transport,
+        table.c.peer_id == peer_id,
+        ~exists(select(upserted.c.id)),
+    )
+    return union_all(select(*upserted.c, true().label("written")), existing)
+
 
 class DraftRepository:
     def __init__(self, session: AsyncSession) -> None:
         self._session = session
 
     async def get_by_transport_peer_id(self, transport: str, peer_id: int) -> Draft | None:
-        return await self._session.scalar(
+        # сессия живёт одно обновление: черновик читаем из БД один раз, дальше отдаём тот же объект
+        draft = self._cached(transport, peer_id)
+        if draft is not None:
+            return draft
+
+        draft = await self._session.scalar(
             select(Draft).where(Draft.transport == transport, Draft.peer_id == peer_id)
         )
+        if draft is not None:
+            self._overlay(draft)
+            self.remember(draft)
+        return draft
 
     async def get_or_create(
         self,
@@ -22,25 +68,67 @@ class DraftRepository:
         *,
         telegram_user_id: int | None = None,
     ) -> Draft:
-        draft = await self.get_by_transport_peer_id(transport, peer_id)
-        if draft:
-            if telegram_user_id is not None and draft.telegram_user_id is None:
-                draft.telegram_user_id = telegram_user_id
-                await self._session.commit()
+        draft = self._cached(transport, peer_id)
+        if draft is not None and (telegram_user_id is None or draft.telegram_user_id is not None):
             return draft
 
-        draft = Draft(
-            transport=transport,
-            peer_id=peer_id,
-            telegram_user_id=telegram_user_id,
-            last_step="start",
-        )
-        self._session.add(draft)
-        await self._session.commit()
+        # один запрос вместо SELECT + INSERT: одновременные первые сообщения не ловят IntegrityError,
+        # а существующая строка читается тем же запросом без новой версии строки и блокировки
+        now = datetime.utcnow()
+        row = (
+            await self._session.execute(
+                select(Draft, column("written", Boolean))
+                .from_statement(_read_or_insert(transport, peer_id, telegram_user_id, now))
+                .execution_options(populate_existing=True)
+            )
+        ).first()
+        if row is not None:
+            draft, written = row
+        else:
+            # гонка с соседним первым сообщением: безусловный upsert дождётся его строки и вернёт её
+            draft = await self._session.scalar(
+                select(Draft)
+                .from_statement(_upsert(transport, peer_id, telegram_user_id, now).returning(Draft))
+                .execution_options(populate_existing=True)
+            )
+            written = True
+        if written:
+            self._session.info[_UPSERTED] = True
+        self._overlay(draft)
+        self.remember(draft)
+        return draft
+
+    async def stage(self, draft: Draft, **values) -> None:
+        # промежуточный шаг анкеты: с буфером уходит в БД пачкой, без него — сразу
+        values.setdefault("updated_at", datetime.utcnow())
+        buffer = get_draft_buffer()
+        if buffer is None or self._session.info.pop(_UPSERTED, False) or self._session.new or self._session.dirty:
+            for field, value in values.items():
+                setattr(draft, field, value)
+            await self._session.commit()
+            return
+        buffer.stage(draft, values)
+
+    def _overlay(self, draft: Draft) -> None:
+        buffer = get_draft_buffer()
+        if buffer is not None:
+            buffer.overlay(draft)
+
+    def remember(self, draft: Draft) -> None:
+        self._session.info[("draft", draft.transport, int(draft.peer_id))] = draft
+
+    def _cached(self, transport: str, peer_id: int) -> Draft | None:
+        draft = self._session.info.get(("draft", transport, int(peer_id)))
+        if draft is None:
+            return None
+        # после rollback объект просрочен или выкинут из сессии — такой перечитываем
+        state = inspect(draft)
+        if not state.persistent or state.expired_attributes:
+            return None
         return draft
 
     async def save(self) -> None:
         await self._session.commit()
 
     async def rollback(self) -> None:
-        await self._session.rollback()
\ No newline at end of file
+        await self._session.rollback()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, func, literal, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import NudgeJob
+
+JOB_PENDING = "pending"
+JOB_SENT = "sent"
+JOB_SKIPPED = "skipped"
+JOB_CANCELLED = "cancelled"
+JOB_DEAD = "dead"
+
+NUDGE_JOBS_CHANNEL = "nudge_jobs"
+
+# состояние уходит в SQL литералом: с параметром generic plan не может выбрать частичный индекс WHERE state = '...'
+_IS_PENDING = NudgeJob.state == literal(JOB_PENDING, literal_execute=True)
+_IS_DEAD = NudgeJob.state == literal(JOB_DEAD, literal_execute=True)
+
+
+class NudgeJobRepository:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def schedule(
+        self,
+        kind: str,
+        target_id: int,
+        *,
+        transport: str,
+        peer_id: int,
+        due_at: datetime,
+    ) -> None:
+        now = datetime.utcnow()
+        stmt = insert(NudgeJob).values(
+            kind=kind,
+            target_id=target_id,
+            transport=transport,
+            peer_id=peer_id,
+            due_at=due_at,
+            state=JOB_PENDING,
+            attempts=0,
+            created_at=now,
+            updated_at=now,
+        )
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_nudge_jobs_kind_target_id",
+            set_={
+                "transport": stmt.excluded.transport,
+                "peer_id": stmt.excluded.peer_id,
+                "due_at": stmt.excluded.due_at,
+                "state": JOB_PENDING,
+                "attempts": 0,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "updated_at": now,
+            },
+        )
+        await self._session.execute(stmt)
+        # NOTIFY уходит воркеру только после commit транзакции, в которой запланирован дожим
+        await self._session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": NUDGE_JOBS_CHANNEL, "payload": kind},
+        )
+
+    async def cancel(self, target_id: int, *kinds: str) -> None:
+        await self._session.execute(
+            update(NudgeJob)
+            .where(NudgeJob.target_id == target_id)
+            .where(NudgeJob.kind.in_(kinds))
+            .where(_IS_PENDING)
+            .values(state=JOB_CANCELLED, updated_at=datetime.utcnow())
+        )
+
+    async def get(self, kind: str, target_id: int) -> NudgeJob | None:
+        return await self._session.scalar(
+            select(NudgeJob).where(NudgeJob.kind == kind, NudgeJob.target_id == target_id)
+        )
+
+    async def claim(self, owner: str, now: datetime, *, limit: int, lease_seconds: int):
+        candidates = (
+            select(NudgeJob.id)
+            .where(_IS_PENDING)
+            .where(NudgeJob.due_at <= now)
+            .where(or_(NudgeJob.lease_expires_at.is_(None), NudgeJob.lease_expires_at <= now))
+            .order_by(NudgeJob.due_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(NudgeJob)
+            .where(NudgeJob.id.in_(candidates))
+            .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            .returning(
+                NudgeJob.id,
+                NudgeJob.kind,
+                NudgeJob.target_id,
+                NudgeJob.transport,
+                NudgeJob.peer_id,
+                NudgeJob.due_at,
+                NudgeJob.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = (await self._session.execute(stmt)).all()
+        await self._session.commit()
+        return rows
+
+    async def count_due(self, now: datetime) -> int:
+        return int(
+            await self._session.scalar(
+                select(func.count())
+                .select_from(NudgeJob)
+                .where(_IS_PENDING)
+                .where(NudgeJob.due_at <= now)
+            )
+            or 0
+        )
+
+    async def next_due_at(self) -> datetime | None:
+        due = await self._session.scalar(
+            select(func.min(NudgeJob.due_at))
+            .where(_IS_PENDING)
+            .where(NudgeJob.lease_expires_at.is_(None))
+        )
+        lease = await self._session.scalar(
+            select(func.min(NudgeJob.lease_expires_at))
+            .where(_IS_PENDING)
+            .where(NudgeJob.lease_expires_at.is_not(None))
+        )
+        candidates = [t for t in (due, lease) if t is not None]
+        return min(candidates) if candidates else None
+
+    async def finish_many(
+        self,
+        owner: str,
+        states: dict[int, str],
+        *,
+        retry_at: dict[int, datetime] | None = None,
+        deferred: set[int] | None = None,
+    ) -> set[int]:
+        if not states:
+            return set()
+        # deferred — отложены из-за недоступности CRM, попытку доставки не тратят
+        attempts = NudgeJob.attempts + 1
+        if deferred:
+            attempts = case((NudgeJob.id.in_(list(deferred)), NudgeJob.attempts), else_=attempts)
+        values = {
+            "state": case(states, value=NudgeJob.id),
+            "attempts": attempts,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "updated_at": datetime.utcnow(),
+        }
+        if retry_at:
+            values["due_at"] = case(retry_at, value=NudgeJob.id, else_=NudgeJob.due_at)
+
+        result = await self._session.execute(
+            update(NudgeJob)
+            .where(NudgeJob.id.in_(list(states)))
+            .where(NudgeJob.lease_owner == owner)
+            .values(**values)
+            .returning(NudgeJob.id)
+            .execution_options(synchronize_session=False)
+        )
+        return set(result.scalars())
+
+    async def list_dead(self, limit: int = 10) -> list[NudgeJob]:
+        result = await self._session.execute(
+            select(NudgeJob).where(_IS_DEAD).order_by(NudgeJob.updated_at.desc()).limit(limit)
+        )
+        return list(result.scalars())
+
+    async def save(self) -> None:
+        await self._session.commit()
+
+    async def rollback(self) -> None:
+        await self._session.rollback()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import case, func, literal, or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import OutboxMessage
+
+OUTBOX_PENDING = "pending"
+OUTBOX_SENT = "sent"
+OUTBOX_DEAD = "dead"
+
+OUTBOX_MESSAGE = "message"
+OUTBOX_CRM_EVENT = "crm_event"
+OUTBOX_CRM_REQUEST = "crm_request"
+
+OUTBOX_CHANNEL = "outbox"
+
+# состояние уходит в SQL литералом: с параметром generic plan не может выбрать частичный индекс WHERE state = '...'
+_IS_PENDING = OutboxMessage.state == literal(OUTBOX_PENDING, literal_execute=True)
+_IS_DEAD = OutboxMessage.state == literal(OUTBOX_DEAD, literal_execute=True)
+
+
+class OutboxRepository:
+    def __init__(self, session: AsyncSession) -> None:
+        self._session = session
+
+    async def add(self, kind: str, payload: dict[str, Any], *, idempotency_key: str) -> None:
+        await self.add_many([(kind, payload, idempotency_key)])
+
+    async def add_many(self, items: list[tuple[str, dict[str, Any], str]], *, delay_seconds: float = 0.0) -> None:
+        if not items:
+            return
+        now = datetime.utcnow()
+        stmt = (
+            insert(OutboxMessage)
+            .values(
+                [
+                    {
+                        "kind": kind,
+                        "payload": payload,
+                        "idempotency_key": key,
+                        "state": OUTBOX_PENDING,
+                        "attempts": 0,
+                        "next_attempt_at": now + timedelta(seconds=delay_seconds),
+                        "created_at": now,
+                    }
+                    for kind, payload, key in items
+                ]
+            )
+            .on_conflict_do_nothing(index_elements=[OutboxMessage.idempotency_key])
+        )
+        await self._session.execute(stmt)
+        # как и у nudge_jobs, NOTIFY доставится только после commit
+        await self._session.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": OUTBOX_CHANNEL, "payload": items[0][0]},
+        )
+
+    async def add_crm_event(self, payload: dict[str, Any], *, idempotency_key: str, delay_seconds: float = 0.0) -> None:
+        await self.add_many([(OUTBOX_CRM_EVENT, payload, idempotency_key)], delay_seconds=delay_seconds)
+
+    async def claim(self, owner: str, now: datetime, *, limit: int, lease_seconds: int):
+        candidates = (
+            select(OutboxMessage.id)
+            .where(_IS_PENDING)
+            .where(OutboxMessage.next_attempt_at <= now)
+            .where(or_(OutboxMessage.lease_expires_at.is_(None), OutboxMessage.lease_expires_at <= now))
+            .order_by(OutboxMessage.next_attempt_at.asc(), OutboxMessage.id.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(candidates))
+            .values(lease_owner=owner, lease_expires_at=now + timedelta(seconds=lease_seconds))
+            .returning(
+                OutboxMessage.id,
+                OutboxMessage.kind,
+                OutboxMessage.payload,
+                OutboxMessage.idempotency_key,
+                OutboxMessage.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = (await self._session.execute(stmt)).all()
+        await self._session.commit()
+        return rows
+
+    async def mark_sent(self, owner: str, ids: list[int]) -> None:
+        if not ids:
+            return
+        now = datetime.utcnow()
+        await self._session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(ids))
+            .where(OutboxMessage.lease_owner == owner)
+            .values(
+                state=OUTBOX_SENT,
+                attempts=OutboxMessage.attempts + 1,
+                sent_at=now,
+                last_error=None,
+                lease_owner=None,
+                lease_expires_at=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def mark_failed(
+        self,
+        owner: str,
+        failures: dict[int, tuple[str, datetime | None]],
+        *,
+        deferred: set[int] | None = None,
+    ) -> None:
+        # retry_at=None — постоянная ошибка или попытки исчерпаны, строка уходит в dead.
+        # deferred — отложены из-за недоступности CRM, попытку не тратят
+        if not failures:
+            return
+        attempts = OutboxMessage.attempts + 1
+        if deferred:
+            attempts = case((OutboxMessage.id.in_(list(deferred)), OutboxMessage.attempts), else_=attempts)
+        values: dict[str, Any] = {
+            "state": case(
+                {i: (OUTBOX_PENDING if retry_at else OUTBOX_DEAD) for i, (_, retry_at) in failures.items()},
+                value=OutboxMessage.id,
+            ),
+            "last_error": case({i: err[:1000] for i, (err, _) in failures.items()}, value=OutboxMessage.id),
+            "attempts": attempts,
+            "lease_owner": None,
+            "lease_expires_at": None,
+        }
+        retries = {i: retry_at for i, (_, retry_at) in failures.items() if retry_at}
+        if retries:
+            values["next_attempt_at"] = case(retries, value=OutboxMessage.id, else_=OutboxMessage.next_attempt_at)
+
+        await self._session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id.in_(list(failures)))
+            .where(OutboxMessage.lease_owner == owner)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def next_due_at(self) -> datetime | None:
+        due = await self._session.scalar(
+            select(func.min(OutboxMessage.next_attempt_at))
+            .where(_IS_PENDING)
+            .where(OutboxMessage.lease_expires_at.is_(None))
+        )
+        lease = await self._session.scalar(
+            select(func.min(OutboxMessage.lease_expires_at))
+            .where(_IS_PENDING)
+            .where(OutboxMessage.lease_expires_at.is_not(None))
+        )
+        candidates = [t for t in (due, lease) if t is not None]
+        return min(candidates) if candidates else None
+
+    async def list_dead(self, limit: int = 10) -> list[OutboxMessage]:
+        result = await self._session.execute(
+            select(OutboxMessage)
+            .where(_IS_DEAD)
+            .order_by(OutboxMessage.id.desc())
+            .limit(limit)
+        )
+        return list(result.scalars())
+
+    async def count_dead(self) -> int:
+        return int(
+            await self._session.scalar(
+                select(func.count()).select_from(OutboxMessage).where(_IS_DEAD)
+            )
+            or 0
+        )
+
+    async def requeue(self, outbox_id: int) -> bool:
+        result = await self._session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == outbox_id)
+            .where(_IS_DEAD)
+            .values(state=OUTBOX_PENDING, attempts=0, next_attempt_at=datetime.utcnow(), last_error=None)
+            .returning(OutboxMessage.id)
+            .execution_options(synchronize_session=False)
+        )
+        requeued = result.scalar() is not None
+        if requeued:
+            await self._session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": OUTBOX_CHANNEL, "payload": "requeue"},
+            )
+        return requeued
+
+    async def save(self) -> None:
+        await self._session.commit()
+
+    async def rollback(self) -> None:
+        await self._session.rollback()
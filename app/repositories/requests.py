@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from sqlalchemy import select
+from datetime import datetime
+
+from sqlalchemy import case, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import Request
@@ -15,9 +17,66 @@ class RequestRepository:
             select(Request).where(Request.client_request_id == client_request_id)
         )
 
+    async def get_latest_by_telegram_user_id(self, telegram_user_id: int) -> Request | None:
+        return await self._session.scalar(
+            select(Request)
+            .where(Request.telegram_user_id == telegram_user_id)
+            .order_by(Request.id.desc())
+            .limit(1)
+        )
+
     async def create(self, request: Request) -> None:
         self._session.add(request)
-        await self._session.commit()
+        await self._session.flush()
+
+    async def set_crm_request_id(self, client_request_id: str, crm_request_id: str) -> None:
+        await self._session.execute(
+            update(Request)
+            .where(Request.client_request_id == client_request_id)
+            .where((Request.crm_request_id.is_(None)) | (Request.crm_request_id == ""))
+            .values(crm_request_id=crm_request_id)
+        )
+
+    async def set_statuses(
+        self,
+        statuses: dict[str, str],
+        *,
+        synced_at: datetime,
+        by_client_request_id: bool = False,
+    ) -> int:
+        if not statuses:
+            return 0
+        column = Request.client_request_id if by_client_request_id else Request.crm_request_id
+        result = await self._session.execute(
+            update(Request)
+            .where(column.in_(list(statuses)))
+            .values(status=case(statuses, value=column), status_synced_at=synced_at)
+            .returning(Request.id)
+            .execution_options(synchronize_session=False)
+        )
+        return len(result.all())
+
+    async def list_for_status_sync(
+        self,
+        *,
+        after_id: int,
+        synced_before: datetime,
+        created_after: datetime,
+        skip_statuses: set[str],
+        limit: int,
+    ):
+        result = await self._session.execute(
+            select(Request.id, Request.crm_request_id)
+            .where(Request.id > after_id)
+            .where(Request.crm_request_id.is_not(None))
+            .where(Request.crm_request_id != "")
+            .where(Request.created_at >= created_after)
+            .where(Request.status.not_in(skip_statuses))
+            .where(or_(Request.status_synced_at.is_(None), Request.status_synced_at < synced_before))
+            .order_by(Request.id.asc())
+            .limit(limit)
+        )
+        return result.all()
 
     async def save(self) -> None:
         await self._session.commit()
@@ -1,51 +1,55 @@
 import uuid
-from app.infrastructure.crm_client import get_crm_client
 from datetime import datetime
 
-async def send_nudge_event(draft, nudge_type: str, action: str):
-    crm = get_crm_client()
+from app.config import settings
+from app.repositories.outbox import OutboxRepository
 
-    event_id = uuid.uuid4().hex
-
-    payload = {
-        "event_id": event_id,
-        "event_type": nudge_type,
-        "action": action,
-        "telegram_user_id": draft.telegram_user_id,
-        "client_request_id": draft.client_request_id,
-    }
-
-    await crm.send_event(payload, idempotency_key=event_id)
-
-async def send_nudge_event(draft, nudge_type: str, action: str):
-    crm = get_crm_client()
-
-    event_id = uuid.uuid4().hex
-
-    payload = {
-        "event_id": event_id,
-        "event_type": nudge_type,
-        "action": action,
-        "telegram_user_id": draft.telegram_user_id,
-        "client_request_id": draft.client_request_id,
-    }
-
-    await crm.send_event(payload, idempotency_key=event_id)
-
-
-async def send_request_nudge_event(req, nudge_type: str, action: str):
-    crm = get_crm_client()
 
+async def _enqueue_event(
+    session,
+    nudge_type: str,
+    action: str,
+    *,
+    telegram_user_id,
+    client_request_id,
+    **extra,
+) -> None:
     event_id = uuid.uuid4().hex
 
     payload = {
         "event_id": event_id,
         "event_type": nudge_type,
         "action": action,
-        "telegram_user_id": int(req.telegram_user_id),
-        "client_request_id": req.client_request_id,
-        "crm_request_id": req.crm_request_id,
+        "telegram_user_id": int(telegram_user_id) if telegram_user_id is not None else None,
+        "client_request_id": client_request_id,
         "timestamp": datetime.utcnow().isoformat(),
+        **extra,
     }
 
-    await crm.send_event(payload, idempotency_key=event_id)
\ No newline at end of file
+    # событие уходит в CRM из outbox; небольшая задержка копит пачку для crm_event_batch_path
+    await OutboxRepository(session).add_crm_event(
+        payload,
+        idempotency_key=event_id,
+        delay_seconds=float(settings.crm_event_flush_seconds),
+    )
+
+
+async def enqueue_nudge_event(session, draft, nudge_type: str, action: str) -> None:
+    await _enqueue_event(
+        session,
+        nudge_type,
+        action,
+        telegram_user_id=draft.telegram_user_id,
+        client_request_id=draft.client_request_id,
+    )
+
+
+async def enqueue_request_nudge_event(session, req, nudge_type: str, action: str) -> None:
+    await _enqueue_event(
+        session,
+        nudge_type,
+        action,
+        telegram_user_id=req.telegram_user_id,
+        client_request_id=req.client_request_id,
+        crm_request_id=req.crm_request_id,
+    )
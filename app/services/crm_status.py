@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Iterable
+
+from app.config import settings
+from app.infrastructure.circuit_breaker import get_crm_breaker
+from app.infrastructure.crm_client import CRMCircuitOpenError, CRMTemporaryError, get_crm_client
+from app.infrastructure.outbound import TokenBucket
+
+log = logging.getLogger("crm")
+
+TERMINAL_STATUSES = {"done", "completed", "paid", "fixed", "closed"}
+CONTACTED_STATUSES = {"in_work", "in_progress", "contacted", "working"} | TERMINAL_STATUSES
+
+_CONTACTED_FLAGS = ("contacted", "in_work", "manager_contacted", "inProgress")
+_INITIAL_STATUSES = {"", "new", "created"}
+
+
+def normalize_status(payload: dict) -> str | None:
+    status = str(payload.get("status") or "").strip().lower()
+    flags = payload.get("flags")
+    # CRM может прислать только флаг «менеджер связался» без смены статуса
+    if status in _INITIAL_STATUSES and isinstance(flags, dict):
+        if any(flags.get(k) is True for k in _CONTACTED_FLAGS):
+            return "contacted"
+    return status[:64] or None
+
+
+class CRMStatusResolver:
+    def __init__(
+        self,
+        *,
+        ttl_seconds: float | None = None,
+        concurrency: int | None = None,
+        timeout: float | None = None,
+        rate: float | None = None,
+    ) -> None:
+        self._ttl = float(settings.crm_status_cache_ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._slots = asyncio.Semaphore(max(1, int(settings.crm_status_concurrency if concurrency is None else concurrency)))
+        self._timeout = float(settings.crm_status_timeout if timeout is None else timeout)
+        self._cache: dict[str, tuple[float, dict]] = {}
+        # rate — лимит вызовов CRM в секунду, None — без лимита
+        self._bucket = TokenBucket(rate, max(1.0, rate)) if rate else None
+
+    async def resolve(self, crm_request_ids: Iterable[str]) -> dict[str, dict]:
+        statuses, _ = await self.resolve_with_failures(crm_request_ids)
+        return statuses
+
+    async def resolve_with_failures(self, crm_request_ids: Iterable[str]) -> tuple[dict[str, dict], set[str]]:
+        # второе — id, по которым CRM была недоступна (breaker, таймаут, CRMTemporaryError).
+        # Id, которого нет ни там, ни там, не разрешился по-настоящему: 4xx, чужой формат, нет в ответе
+        now = time.monotonic()
+        self._evict(now)
+
+        ids = {str(i) for i in crm_request_ids if i}
+        result = {i: self._cache[i][1] for i in ids if i in self._cache}
+        missing = sorted(ids - result.keys())
+        if not missing:
+            return result, set()
+
+        breaker = get_crm_breaker()
+        if breaker.is_open:
+            # CRM недоступна: не тратим таймауты, дожимы без статуса уйдут на повтор
+            log.info("CRM circuit open, skipping status lookup: ids=%s retry_in=%.0fs", len(missing), breaker.retry_in())
+            return result, set(missing)
+
+        crm = get_crm_client()
+        if getattr(crm, "supports_bulk_status", False):
+            fetched, unavailable = await self._fetch_bulk(crm, missing)
+        else:
+            fetched, unavailable = await self._fetch_each(crm, missing)
+
+        expires_at = time.monotonic() + self._ttl
+        for crm_request_id, payload in fetched.items():
+            self._cache[crm_request_id] = (expires_at, payload)
+        result.update(fetched)
+        return result, unavailable
+
+    def invalidate(self, crm_request_id: str) -> None:
+        self._cache.pop(str(crm_request_id), None)
+
+    async def _fetch_bulk(self, crm, ids: list[str]) -> tuple[dict[str, dict], set[str]]:
+        size = max(1, int(settings.crm_status_bulk_size))
+        chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+        unavailable: set[str] = set()
+
+        async def fetch_chunk(chunk: list[str]) -> dict[str, dict]:
+            async with self._slots:
+                await self._pace()
+                try:
+                    return await asyncio.wait_for(crm.check_statuses(chunk), timeout=self._timeout)
+                except (CRMTemporaryError, asyncio.TimeoutError) as e:
+                    if not isinstance(e, CRMCircuitOpenError):
+                        log.warning("CRM bulk status unavailable: size=%s error=%r", len(chunk), e)
+                    unavailable.update(chunk)
+                    return {}
+                except Exception:
+                    log.exception("CRM bulk status failed: size=%s", len(chunk))
+                    return {}
+
+        result: dict[str, dict] = {}
+        for part in await asyncio.gather(*(fetch_chunk(c) for c in chunks)):
+            result.update(part)
+        return result, unavailable
+
+    async def _fetch_each(self, crm, ids: list[str]) -> tuple[dict[str, dict], set[str]]:
+        unavailable: set[str] = set()
+
+        async def fetch_one(crm_request_id: str):
+            async with self._slots:
+                await self._pace()
+                try:
+                    st = await asyncio.wait_for(crm.check_status(crm_request_id), timeout=self._timeout)
+                except (CRMTemporaryError, asyncio.TimeoutError) as e:
+                    if not isinstance(e, CRMCircuitOpenError):
+                        log.warning("CRM status unavailable: crm_request_id=%s error=%r", crm_request_id, e)
+                    unavailable.add(crm_request_id)
+                    return crm_request_id, None
+                except Exception:
+                    log.exception("CRM status failed: crm_request_id=%s", crm_request_id)
+                    return crm_request_id, None
+            return crm_request_id, st
+
+        pairs = await asyncio.gather(*(fetch_one(i) for i in ids))
+        return {i: st for i, st in pairs if isinstance(st, dict)}, unavailable
+
+    async def _pace(self) -> None:
+        if self._bucket is None:
+            return
+        delay = self._bucket.take(time.monotonic())
+        while delay > 0:
+            await asyncio.sleep(delay)
+            delay = self._bucket.take(time.monotonic())
+
+    def _evict(self, now: float) -> None:
+        for key in [k for k, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            del self._cache[key]
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.db import AsyncSessionLocal, engine
+from app.infrastructure.circuit_breaker import get_crm_breaker
+from app.repositories.requests import RequestRepository
+from app.services.crm_status import TERMINAL_STATUSES, CRMStatusResolver, normalize_status
+
+log = logging.getLogger("crm")
+
+# один сверяющий на все воркеры: остальные пропускают запуск
+CRM_SYNC_LOCK_ID = 0x63726D73
+
+
+@dataclass(frozen=True)
+class SyncStats:
+    scanned: int
+    updated: int
+    pages: int
+
+
+class CRMStatusSync:
+    def __init__(self) -> None:
+        self._statuses = CRMStatusResolver(ttl_seconds=0, rate=float(settings.crm_sync_rate))
+        self._page_size = max(1, int(settings.crm_sync_page_size))
+        self._interval = max(1, int(settings.crm_sync_interval_seconds))
+
+    async def run_once(self) -> SyncStats | None:
+        async with engine.connect() as lock_conn:
+            if not await lock_conn.scalar(select(func.pg_try_advisory_lock(CRM_SYNC_LOCK_ID))):
+                log.info("crm status sync is running elsewhere, skipping")
+                return None
+            try:
+                return await self._sync()
+            finally:
+                await lock_conn.scalar(select(func.pg_advisory_unlock(CRM_SYNC_LOCK_ID)))
+
+    async def _sync(self) -> SyncStats:
+        started = time.monotonic()
+        now = datetime.utcnow()
+        # свежие статусы (вебхук, прошлый проход) не перезапрашиваем
+        synced_before = now - timedelta(seconds=self._interval / 2)
+        created_after = now - timedelta(days=int(settings.crm_sync_max_age_days))
+
+        after_id = 0
+        scanned = updated = pages = 0
+        while True:
+            async with AsyncSessionLocal() as session:
+                rows = await RequestRepository(session).list_for_status_sync(
+                    after_id=after_id,
+                    synced_before=synced_before,
+                    created_after=created_after,
+                    skip_statuses=TERMINAL_STATUSES,
+                    limit=self._page_size,
+                )
+            if not rows:
+                break
+
+            pages += 1
+            scanned += len(rows)
+            after_id = rows[-1].id
+
+            fetched = await self._statuses.resolve(r.crm_request_id for r in rows)
+            statuses = {i: st for i, st in ((i, normalize_status(p)) for i, p in fetched.items()) if st}
+            if statuses:
+                async with AsyncSessionLocal() as session:
+                    repo = RequestRepository(session)
+                    updated += await repo.set_statuses(statuses, synced_at=datetime.utcnow())
+                    await repo.save()
+
+            if get_crm_breaker().is_open:
+                log.warning("crm status sync interrupted: circuit open, after_id=%s", after_id)
+                break
+
+        log.info(
+            "crm status sync done: pages=%s scanned=%s updated=%s elapsed=%.1fs",
+            pages,
+            scanned,
+            updated,
+            time.monotonic() - started,
+        )
+        return SyncStats(scanned=scanned, updated=updated, pages=pages)
@@ -1,17 +1,25 @@
 from __future__ import annotations
 
-import asyncio
 import logging
-from datetime import datetime, timezone
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any
 from zoneinfo import ZoneInfo
 
-from aiogram import Bot
-from sqlalchemy import select
+from sqlalchemy import select, update
 
+from app.config import settings
 from app.db import AsyncSessionLocal
-from app.infrastructure.crm_client import get_crm_client
+from app.infrastructure.circuit_breaker import get_crm_breaker
+from app.infrastructure.crm_client import CRMPermanentError, CRMTemporaryError
 from app.keyboards import kb_nudge1, kb_nudge2, kb_nudge3, kb_nudge4, kb_nudge5, kb_nudge6, kb_nudge7
 from app.models import Draft, Request
+from app.repositories.nudge_jobs import JOB_DEAD, JOB_PENDING, JOB_SENT, JOB_SKIPPED, NudgeJobRepository
+from app.repositories.outbox import OutboxRepository
+from app.services.crm_status import CONTACTED_STATUSES, TERMINAL_STATUSES, CRMStatusResolver
+from app.services.outbox import message_item
+from app.utils import backoff_seconds, worker_id
 
 log = logging.getLogger("nudges")
 
@@ -59,13 +67,10 @@ STEPS_FOR_NUDGE2 = [
     "username_manual",
 ]
 
-_TERMINAL_STATUSES = {"done", "completed", "paid", "fixed", "closed"}
-_CONTACTED_STATUSES = {"in_work", "in_progress", "contacted", "working"} | _TERMINAL_STATUSES
-
 
 def _crm_contacted(payload: dict) -> bool:
     status = str(payload.get("status") or "").strip().lower()
-    if status in _CONTACTED_STATUSES:
+    if status in CONTACTED_STATUSES:
         return True
 
     flags = payload.get("flags")
@@ -84,318 +89,338 @@ def _today_istanbul():
 
 def _crm_terminal(payload: dict) -> bool:
     status = str(payload.get("status") or "").strip().lower()
-    return status in _TERMINAL_STATUSES
+    return status in TERMINAL_STATUSES
 
 
-class NudgeService:
-    def __init__(self, bot: Bot, *, vk_sender=None) -> None:
-        self.bot = bot
-        self.vk_sender = vk_sender
-
-    async def tick(self) -> None:
-        await self._check_nudge1()
-        await self._check_nudge2()
-        await self._check_nudge3()
-        await self._check_nudge4()
-        await self._check_nudge5()
-        await self._check_nudge6()
-        await self._check_nudge7()
-
-    async def _send(self, transport: str, peer_id: int, text: str, *, reply_markup=None) -> None:
-        if transport == "tg":
-            await self.bot.send_message(chat_id=peer_id, text=text, reply_markup=reply_markup)
-            return
+@dataclass(frozen=True)
+class NudgeDecision:
+    send: bool
+    text: str = ""
+    reply_markup: Any = None
+    answer: str | None = None
 
-        if transport == "vk":
-            if self.vk_sender is None:
-                raise RuntimeError("vk_sender is not configured")
-            await self.vk_sender(peer_id, text)
-            return
 
-        raise ValueError(f"unsupported transport: {transport}")
+def _skip(answer: str | None = None) -> NudgeDecision:
+    return NudgeDecision(send=False, answer=answer)
 
-    async def _check_nudge1(self) -> None:
-        now = datetime.utcnow()
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(Request.id, Request.transport, Request.peer_id, Request.crm_request_id)
-                .where(Request.nudge1_answer.is_(None))
-                .where(Request.nudge1_sent_at.is_(None))
-                .where(Request.nudge1_planned_at.is_not(None))
-                .where(Request.nudge1_planned_at <= now)
-                .order_by(Request.id.asc())
-                .limit(50)
-                .with_for_update(skip_locked=True)
-            )
-            rows = (await session.execute(stmt)).all()
-            if not rows:
-                return
 
-            crm = get_crm_client()
+def _message(text: str, reply_markup: Any) -> NudgeDecision:
+    return NudgeDecision(send=True, text=text, reply_markup=reply_markup)
 
-            for req_id, transport, peer_id, crm_request_id in rows:
-                try:
-                    req = await session.get(Request, req_id)
-                    if not req:
-                        continue
 
-                    if req.nudge1_answer is not None or req.nudge1_sent_at is not None:
-                        continue
+@dataclass(frozen=True)
+class TickStats:
+    claimed: int
+    finished: int
 
-                    if crm_request_id:
-                        st = await crm.check_status(str(crm_request_id))
-                        if isinstance(st, dict) and _crm_contacted(st):
-                            req.nudge1_sent_at = now
-                            req.nudge1_answer = "skip_contacted"
-                            await session.commit()
-                            continue
 
-                    req.nudge1_sent_at = datetime.utcnow()
-                    await session.commit()
+@dataclass
+class _Delivery:
+    job_id: int
+    kind: str
+    target_id: int
+    transport: str
+    peer_id: int
+    due_at: datetime
+    attempts: int = 0
+    decision: NudgeDecision | None = None
+    state: str = JOB_PENDING
+    retry_at: datetime | None = None
+    deferred: bool = False
 
-                    await self._send(str(transport), int(peer_id), NUDGE1_TEXT, reply_markup=kb_nudge1())
 
-                except Exception:
-                    await session.rollback()
-                    log.exception("n1 send failed: req_id=%s", req_id)
+_TARGETS = {
+    "nudge1": Request,
+    "nudge2": Draft,
+    "nudge3": Draft,
+    "nudge4": Draft,
+    "nudge5": Request,
+    "nudge6": Request,
+    "nudge7": Request,
+}
 
-    async def _check_nudge2(self) -> None:
-        now = datetime.utcnow()
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(Draft.id, Draft.transport, Draft.peer_id, Draft.last_step)
-                .where(Draft.last_step.in_(STEPS_FOR_NUDGE2))
-                .where(Draft.give_amount.is_not(None))
-                .where(Draft.nudge2_answer.is_(None))
-                .where(Draft.nudge2_sent_at.is_(None))
-                .where(Draft.nudge2_planned_at.is_not(None))
-                .where(Draft.nudge2_planned_at <= now)
-                .limit(50)
-            )
-            rows = (await session.execute(stmt)).all()
-            if not rows:
-                return
 
-            for draft_id, transport, peer_id, last_step in rows:
-                try:
-                    await self._send(str(transport), int(peer_id), NUDGE2_TEXT, reply_markup=kb_nudge2())
+_CRM_GATED = {"nudge1", "nudge5", "nudge6", "nudge7"}
 
-                    draft = await session.get(Draft, draft_id)
-                    if draft:
-                        draft.nudge2_sent_at = datetime.utcnow()
-                        await session.commit()
 
-                    log.info("n2 sent: transport=%s peer_id=%s step=%s", transport, peer_id, last_step)
+def _local_status(req: Request, now: datetime) -> dict | None:
+    # статус, присланный CRM вебхуком; «в работе» и финальные назад не откатываются, им верим всегда
+    if req.status_synced_at is None:
+        return None
+    payload = {"status": req.status}
+    if _crm_contacted(payload):
+        return payload
+    if now - req.status_synced_at <= timedelta(seconds=float(settings.crm_status_local_ttl_seconds)):
+        return payload
+    return None
 
-                except Exception:
-                    await session.rollback()
-                    log.exception("n2 send failed: transport=%s peer_id=%s", transport, peer_id)
 
-    async def _check_nudge3(self) -> None:
-        now = datetime.utcnow()
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(Draft.id, Draft.transport, Draft.peer_id, Draft.client_request_id)
-                .where(Draft.step6_at.is_not(None))
-                .where(Draft.nudge3_planned_at.is_not(None))
-                .where(Draft.nudge3_planned_at <= now)
-                .where(Draft.nudge3_sent_at.is_(None))
-                .where(Draft.nudge3_answer.is_(None))
-                .limit(50)
-            )
-            rows = (await session.execute(stmt)).all()
-            if not rows:
-                return
-
-            for draft_id, transport, peer_id, client_request_id in rows:
-                try:
-                    if client_request_id:
-                        req_exists = await session.scalar(
-                            select(Request.id).where(Request.client_request_id == str(client_request_id))
-                        )
-                        if req_exists:
-                            draft = await session.get(Draft, draft_id)
-                            if draft and draft.nudge3_answer is None:
-                                draft.nudge3_answer = "skip_confirmed"
-                                draft.nudge3_sent_at = now
-                                await session.commit()
-                            continue
-
-                    await self._send(str(transport), int(peer_id), NUDGE3_TEXT, reply_markup=kb_nudge3())
-
-                    draft = await session.get(Draft, draft_id)
-                    if draft and draft.nudge3_sent_at is None:
-                        draft.nudge3_sent_at = datetime.utcnow()
-                        await session.commit()
-
-                except Exception:
-                    await session.rollback()
-                    log.exception("n3 send failed: transport=%s peer_id=%s", transport, peer_id)
-
-    async def _check_nudge4(self) -> None:
+def _status_of(statuses: dict[str, dict | None], crm_request_id: str) -> dict:
+    # None — CRM была недоступна: дожим откладывается без траты попытки.
+    # Нет ключа — статус не разрешился (4xx, чужой формат, нет в ответе): обычная ошибка, с попытками и dead
+    key = str(crm_request_id)
+    if key not in statuses:
+        raise CRMPermanentError(f"crm status unresolved: {crm_request_id}")
+    st = statuses[key]
+    if st is None:
+        raise CRMTemporaryError(f"crm status unavailable: {crm_request_id}")
+    return st
+
+
+class NudgeService:
+    def __init__(self) -> None:
+        self._handlers = {
+            "nudge1": self._check_nudge1,
+            "nudge2": self._check_nudge2,
+            "nudge3": self._check_nudge3,
+            "nudge4": self._check_nudge4,
+            "nudge5": self._check_nudge5,
+            "nudge6": self._check_nudge6,
+            "nudge7": self._check_nudge7,
+        }
+        self._statuses = CRMStatusResolver()
+        self._lease_seconds = int(getattr(settings, "nudge_lease_seconds", 120))
+        self._max_attempts = max(1, int(settings.nudge_max_attempts))
+        self.worker_id = worker_id()
+
+    @property
+    def batch_size(self) -> int:
+        return int(getattr(settings, "nudge_batch_size", 50))
+
+    async def tick(self) -> TickStats:
         now = datetime.utcnow()
+
         async with AsyncSessionLocal() as session:
-            stmt = (
-                select(Draft.id, Draft.transport, Draft.peer_id)
-                .where(Draft.nudge2_answer == "later")
-                .where(Draft.nudge4_planned_at.is_not(None))
-                .where(Draft.nudge4_planned_at <= now)
-                .where(Draft.nudge4_sent_at.is_(None))
-                .where(Draft.nudge4_answer.is_(None))
-                .limit(50)
-            )
-            rows = (await session.execute(stmt)).all()
+            jobs = NudgeJobRepository(session)
+            rows = await jobs.claim(self.worker_id, now, limit=self.batch_size, lease_seconds=self._lease_seconds)
             if not rows:
-                return
+                return TickStats(claimed=0, finished=0)
 
-            for draft_id, transport, peer_id in rows:
-                try:
-                    await self._send(str(transport), int(peer_id), NUDGE4_TEXT, reply_markup=kb_nudge4())
+            deliveries = await self._prepare(session, rows, now)
+            # сообщения уходят в outbox той же транзакцией, что и отметки nudgeN_sent_at
+            await self._write_results(session, jobs, deliveries, now)
+            await jobs.save()
 
-                    draft = await session.get(Draft, draft_id)
-                    if draft and draft.nudge4_sent_at is None:
-                        draft.nudge4_sent_at = datetime.utcnow()
-                        await session.commit()
+        return TickStats(claimed=len(rows), finished=sum(1 for d in deliveries if d.state != JOB_PENDING))
 
-                except Exception:
-                    await session.rollback()
-                    log.exception("n4 send failed: transport=%s peer_id=%s", transport, peer_id)
-
-    async def _check_nudge5(self) -> None:
-        now = datetime.utcnow()
-        today = now.date()
+    async def backlog(self) -> int:
+        async with AsyncSessionLocal() as session:
+            return await NudgeJobRepository(session).count_due(datetime.utcnow())
 
+    async def next_due_at(self) -> datetime | None:
         async with AsyncSessionLocal() as session:
-            stmt = (
-                select(Request.id, Request.transport, Request.peer_id, Request.crm_request_id)
-                .where(Request.nudge5_planned_at.is_not(None))
-                .where(Request.nudge5_planned_at <= now)
-                .where(Request.nudge5_sent_at.is_(None))
-                .where(Request.nudge5_answer.is_(None))
-                .order_by(Request.id.asc())
-                .limit(50)
+            return await NudgeJobRepository(session).next_due_at()
+
+    async def _prepare(self, session, rows, now: datetime) -> list[_Delivery]:
+        targets = await self._load_targets(session, rows)
+
+        statuses: dict[str, dict | None] = {}
+        remote: list[str] = []
+        for row in rows:
+            req = targets.get((Request, row.target_id)) if row.kind in _CRM_GATED else None
+            if req is None or not req.crm_request_id:
+                continue
+            local = _local_status(req, now)
+            if local is not None:
+                statuses[str(req.crm_request_id)] = local
+            else:
+                remote.append(req.crm_request_id)
+        if remote:
+            fetched, unavailable = await self._statuses.resolve_with_failures(remote)
+            statuses.update(fetched)
+            statuses.update(dict.fromkeys(unavailable))
+
+        deliveries: list[_Delivery] = []
+        for row in rows:
+            job_id, kind, target_id = row.id, row.kind, row.target_id
+            d = _Delivery(
+                job_id=job_id,
+                kind=kind,
+                target_id=target_id,
+                transport=str(row.transport),
+                peer_id=int(row.peer_id),
+                due_at=row.due_at,
+                attempts=int(row.attempts or 0) + 1,
+            )
+            deliveries.append(d)
+
+            handler = self._handlers.get(kind)
+            if handler is None:
+                log.warning("unknown nudge job kind: job_id=%s kind=%s", job_id, kind)
+                d.state = JOB_SKIPPED
+                continue
+
+            try:
+                d.decision = await handler(session, targets.get((_TARGETS[kind], target_id)), now, statuses)
+            except CRMTemporaryError as e:
+                # CRM недоступна (в т.ч. открыт breaker) — откладываем, не тратя попытку:
+                # иначе многочасовой простой CRM отправит все дожимы в dead
+                log.info("%s deferred: job_id=%s target_id=%s reason=%s", kind, job_id, target_id, e)
+                self._defer(d, now)
+                continue
+            except Exception:
+                log.exception("%s check failed: job_id=%s target_id=%s attempts=%s", kind, job_id, target_id, d.attempts)
+                self._schedule_retry(d, now)
+                continue
+
+            d.state = JOB_SENT if d.decision.send else JOB_SKIPPED
+
+        return deliveries
+
+    def _defer(self, d: _Delivery, now: datetime) -> None:
+        d.attempts -= 1
+        d.deferred = True
+        delay = max(float(settings.nudge_retry_seconds), get_crm_breaker().retry_in())
+        d.retry_at = now + timedelta(seconds=delay)
+
+    def _schedule_retry(self, d: _Delivery, now: datetime) -> None:
+        if d.attempts >= self._max_attempts:
+            log.error("%s dead letter: job_id=%s target_id=%s attempts=%s", d.kind, d.job_id, d.target_id, d.attempts)
+            d.state = JOB_DEAD
+            return
+        delay = backoff_seconds(d.attempts, settings.nudge_retry_seconds, settings.nudge_retry_max_seconds)
+        d.retry_at = now + timedelta(seconds=delay)
+
+    async def _load_targets(self, session, rows) -> dict[tuple[Any, int], Any]:
+        ids_by_model: dict[Any, set[int]] = defaultdict(set)
+        for row in rows:
+            if row.kind in _TARGETS:
+                ids_by_model[_TARGETS[row.kind]].add(row.target_id)
+
+        targets: dict[tuple[Any, int], Any] = {}
+        for model, ids in ids_by_model.items():
+            for obj in (await session.execute(select(model).where(model.id.in_(ids)))).scalars():
+                targets[(model, obj.id)] = obj
+        return targets
+
+    async def _write_results(self, session, jobs: NudgeJobRepository, deliveries: list[_Delivery], now: datetime) -> None:
+        owned = await jobs.finish_many(
+            self.worker_id,
+            {d.job_id: d.state for d in deliveries},
+            retry_at={d.job_id: d.retry_at for d in deliveries if d.retry_at is not None},
+            deferred={d.job_id for d in deliveries if d.deferred},
+        )
+        if len(owned) < len(deliveries):
+            log.warning(
+                "nudge leases expired before batch finished: worker=%s lost=%s",
+                self.worker_id,
+                len(deliveries) - len(owned),
             )
-            rows = (await session.execute(stmt)).all()
-            if not rows:
-                return
 
-            crm = get_crm_client()
+        messages = []
+        stamps: dict[tuple[str, str | None], list[int]] = defaultdict(list)
+        for d in deliveries:
+            if d.job_id not in owned:
+                continue
+            if d.state == JOB_SENT:
+                messages.append(
+                    message_item(
+                        d.transport,
+                        d.peer_id,
+                        d.decision.text,
+                        d.decision.reply_markup,
+                        idempotency_key=f"{d.kind}:{d.target_id}:{d.due_at:%Y%m%d%H%M%S}",
+                    )
+                )
+                stamps[(d.kind, None)].append(d.target_id)
+            elif d.state == JOB_SKIPPED and d.decision is not None and d.decision.answer:
+                stamps[(d.kind, d.decision.answer)].append(d.target_id)
+
+        for (kind, answer), target_ids in stamps.items():
+            model = _TARGETS[kind]
+            values = {f"{kind}_sent_at": now}
+            if answer is not None:
+                values[f"{kind}_answer"] = answer
+            await session.execute(
+                update(model)
+                .where(model.id.in_(target_ids))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
 
-            for req_id, transport, peer_id, crm_request_id in rows:
-                try:
-                    req = await session.get(Request, req_id)
-                    if req is None:
-                        continue
+        await OutboxRepository(session).add_many(messages)
 
-                    if req.desired_date is None or req.desired_date == today:
-                        req.nudge5_sent_at = now
-                        req.nudge5_answer = "skip_date"
-                        await session.commit()
-                        continue
+    async def _check_nudge1(self, session, req: Request | None, now: datetime, statuses: dict[str, dict | None]) -> NudgeDecision:
+        if req is None or req.nudge1_answer is not None or req.nudge1_sent_at is not None:
+            return _skip()
 
-                    if crm_request_id:
-                        st = await asyncio.wait_for(crm.check_status(str(crm_request_id)), timeout=15)
-                        if isinstance(st, dict) and _crm_terminal(st):
-                            req.nudge5_sent_at = now
-                            req.nudge5_answer = "skip_terminal"
-                            await session.commit()
-                            continue
+        if req.crm_request_id:
+            if _crm_contacted(_status_of(statuses, req.crm_request_id)):
+                return _skip("skip_contacted")
 
-                    await self._send(str(transport), int(peer_id), NUDGE5_TEXT, reply_markup=kb_nudge5())
+        return _message(NUDGE1_TEXT, kb_nudge1())
 
-                    req.nudge5_sent_at = datetime.utcnow()
-                    await session.commit()
+    async def _check_nudge2(self, session, draft: Draft | None, now: datetime, statuses: dict[str, dict | None]) -> NudgeDecision:
+        if draft is None:
+            return _skip()
 
-                except Exception:
-                    await session.rollback()
-                    log.exception("n5 send failed: transport=%s peer_id=%s", transport, peer_id)
+        if (
+            draft.last_step not in STEPS_FOR_NUDGE2
+            or draft.give_amount is None
+            or draft.nudge2_answer is not None
+            or draft.nudge2_sent_at is not None
+        ):
+            return _skip()
 
-    async def _check_nudge6(self) -> None:
-        now = datetime.utcnow()
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(Request.id, Request.transport, Request.peer_id, Request.crm_request_id)
-                .where(Request.nudge6_planned_at.is_not(None))
-                .where(Request.nudge6_planned_at <= now)
-                .where(Request.nudge6_sent_at.is_(None))
-                .where(Request.nudge6_answer.is_(None))
-                .order_by(Request.id.asc())
-                .limit(50)
+        return _message(NUDGE2_TEXT, kb_nudge2())
+
+    async def _check_nudge3(self, session, draft: Draft | None, now: datetime, statuses: dict[str, dict | None]) -> NudgeDecision:
+        if draft is None:
+            return _skip()
+
+        if draft.step6_at is None or draft.nudge3_sent_at is not None or draft.nudge3_answer is not None:
+            return _skip()
+
+        if draft.client_request_id:
+            req_exists = await session.scalar(
+                select(Request.id).where(Request.client_request_id == str(draft.client_request_id))
             )
-            rows = (await session.execute(stmt)).all()
-            if not rows:
-                return
+            if req_exists:
+                return _skip("skip_confirmed")
 
-            crm = get_crm_client()
+        return _message(NUDGE3_TEXT, kb_nudge3())
 
-            for req_id, transport, peer_id, crm_request_id in rows:
-                try:
-                    req = await session.get(Request, req_id)
-                    if req is None:
-                        continue
+    async def _check_nudge4(self, session, draft: Draft | None, now: datetime, statuses: dict[str, dict | None]) -> NudgeDecision:
+        if draft is None:
+            return _skip()
 
-                    if crm_request_id:
-                        st = await asyncio.wait_for(crm.check_status(str(crm_request_id)), timeout=15)
-                        if isinstance(st, dict) and _crm_terminal(st):
-                            req.nudge6_sent_at = now
-                            req.nudge6_answer = "skip_terminal"
-                            await session.commit()
-                            continue
+        if draft.nudge2_answer != "later" or draft.nudge4_sent_at is not None or draft.nudge4_answer is not None:
+            return _skip()
 
-                    await self._send(str(transport), int(peer_id), NUDGE6_TEXT, reply_markup=kb_nudge6())
+        return _message(NUDGE4_TEXT, kb_nudge4())
 
-                    req.nudge6_sent_at = datetime.utcnow()
-                    await session.commit()
+    async def _check_nudge5(self, session, req: Request | None, now: datetime, statuses: dict[str, dict | None]) -> NudgeDecision:
+        if req is None or req.nudge5_sent_at is not None or req.nudge5_answer is not None:
+            return _skip()
 
-                except Exception:
-                    await session.rollback()
-                    log.exception("n6 send failed: transport=%s peer_id=%s", transport, peer_id)
+        if req.desired_date is None or req.desired_date == now.date():
+            return _skip("skip_date")
 
-    async def _check_nudge7(self) -> None:
-        now = datetime.utcnow()
-        today_ist = _today_istanbul()
+        if req.crm_request_id:
+            if _crm_terminal(_status_of(statuses, req.crm_request_id)):
+                return _skip("skip_terminal")
 
-        async with AsyncSessionLocal() as session:
-            stmt = (
-                select(Request.id, Request.transport, Request.peer_id, Request.crm_request_id, Request.desired_date)
-                .where(Request.nudge7_planned_at.is_not(None))
-                .where(Request.nudge7_planned_at <= now)
-                .where(Request.nudge7_sent_at.is_(None))
-                .where(Request.nudge7_answer.is_(None))
-                .order_by(Request.id.asc())
-                .limit(50)
-            )
-            rows = (await session.execute(stmt)).all()
-            if not rows:
-                return
-
-            crm = get_crm_client()
-
-            for req_id, transport, peer_id, crm_request_id, desired_date in rows:
-                try:
-                    req = await session.get(Request, req_id)
-                    if req is None:
-                        continue
-
-                    if desired_date and desired_date != today_ist:
-                        req.nudge7_sent_at = now
-                        req.nudge7_answer = "skip_not_today"
-                        await session.commit()
-                        continue
-
-                    if crm_request_id:
-                        st = await asyncio.wait_for(crm.check_status(str(crm_request_id)), timeout=15)
-                        if isinstance(st, dict) and _crm_terminal(st):
-                            req.nudge7_sent_at = now
-                            req.nudge7_answer = "skip_terminal"
-                            await session.commit()
-                            continue
-
-                    await self._send(str(transport), int(peer_id), NUDGE7_TEXT, reply_markup=kb_nudge7())
-
-                    req.nudge7_sent_at = datetime.utcnow()
-                    await session.commit()
-
-                except Exception:
-                    await session.rollback()
-                    log.exception("n7 send failed: transport=%s peer_id=%s", transport, peer_id)
\ No newline at end of file
+        return _message(NUDGE5_TEXT, kb_nudge5(req.id))
+
+    async def _check_nudge6(self, session, req: Request | None, now: datetime, statuses: dict[str, dict | None]) -> NudgeDecision:
+        if req is None or req.nudge6_sent_at is not None or req.nudge6_answer is not None:
+            return _skip()
+
+        if req.crm_request_id:
+            if _crm_terminal(_status_of(statuses, req.crm_request_id)):
+                return _skip("skip_terminal")
+
+        return _message(NUDGE6_TEXT, kb_nudge6(req.id))
+
+    async def _check_nudge7(self, session, req: Request | None, now: datetime, statuses: dict[str, dict | None]) -> NudgeDecision:
+        if req is None or req.nudge7_sent_at is not None or req.nudge7_answer is not None:
+            return _skip()
+
+        if req.desired_date and req.desired_date != _today_istanbul():
+            return _skip("skip_not_today")
+
+        if req.crm_request_id:
+            if _crm_terminal(_status_of(statuses, req.crm_request_id)):
+                return _skip("skip_terminal")
+
+        return _message(NUDGE7_TEXT, kb_nudge7(req.id))
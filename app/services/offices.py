@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from aiogram.types import InlineKeyboardMarkup
+
+from app.config import settings
+from app.infrastructure.crm_client import get_crm_client
+from app.keyboards import kb_offices
+
+log = logging.getLogger("crm")
+
+
+def _normalize(raw: dict) -> dict | None:
+    office_id = str(raw.get("id") or "").strip()
+    if not office_id:
+        return None
+    return {
+        "id": office_id,
+        "button_text": str(raw.get("button_text") or raw.get("title") or raw.get("name") or office_id),
+        "city": raw.get("city"),
+    }
+
+
+class OfficeDirectory:
+    def __init__(self, *, ttl_seconds: float | None = None) -> None:
+        self._ttl = float(settings.office_cache_ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._offices: list[dict] | None = None
+        self._by_id: dict[str, dict] = {}
+        self._keyboard: InlineKeyboardMarkup | None = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self._refresh_task: asyncio.Task | None = None
+
+    async def offices(self) -> list[dict]:
+        await self._ensure_loaded()
+        return list(self._offices or [])
+
+    async def get(self, office_id: str) -> dict | None:
+        await self._ensure_loaded()
+        return self._by_id.get(str(office_id))
+
+    async def label(self, office_id: str) -> str:
+        office = await self.get(office_id)
+        return office["button_text"] if office else str(office_id)
+
+    async def keyboard(self) -> InlineKeyboardMarkup:
+        await self._ensure_loaded()
+        return self._keyboard
+
+    def invalidate(self) -> None:
+        self._loaded_at = 0.0
+
+    async def _ensure_loaded(self) -> None:
+        if self._offices is None:
+            # первая загрузка — ждём CRM, ошибку отдаём вызывающему
+            async with self._lock:
+                if self._offices is None:
+                    await self._load()
+            return
+
+        if time.monotonic() - self._loaded_at >= self._ttl and (self._refresh_task is None or self._refresh_task.done()):
+            # устаревший справочник отдаём сразу, обновляем в фоне
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self) -> None:
+        async with self._lock:
+            try:
+                await self._load()
+            except Exception:
+                log.warning("office directory refresh failed, serving stale data", exc_info=True)
+                self._loaded_at = time.monotonic() - self._ttl + min(self._ttl, float(settings.office_cache_retry_seconds))
+
+    async def _load(self) -> None:
+        raw = await get_crm_client().get_offices()
+        offices = [o for o in (_normalize(r) for r in raw if isinstance(r, dict)) if o is not None]
+        self._offices = offices
+        self._by_id = {o["id"]: o for o in offices}
+        self._keyboard = kb_offices(offices)
+        self._loaded_at = time.monotonic()
+        log.info("office directory loaded: offices=%s", len(offices))
+
+
+_directory: OfficeDirectory | None = None
+
+
+def get_office_directory() -> OfficeDirectory:
+    global _directory
+    if _directory is None:
+        _directory = OfficeDirectory()
+    return _directory
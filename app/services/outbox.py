@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from aiogram import Bot
+from aiogram.types import InlineKeyboardMarkup
+
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.infrastructure.circuit_breaker import get_crm_breaker
+from app.infrastructure.crm_client import CRMPermanentError, CRMTemporaryError, get_crm_client
+from app.infrastructure.messengers.telegram import telegram_permanent_error
+from app.repositories.outbox import OUTBOX_CRM_EVENT, OUTBOX_CRM_REQUEST, OUTBOX_MESSAGE, OutboxRepository
+from app.repositories.requests import RequestRepository
+from app.utils import backoff_seconds, worker_id
+
+log = logging.getLogger("outbox")
+
+
+def message_item(
+    transport: str,
+    peer_id: int,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None,
+    *,
+    idempotency_key: str,
+) -> tuple[str, dict[str, Any], str]:
+    payload = {
+        "transport": transport,
+        "peer_id": int(peer_id),
+        "text": text,
+        "reply_markup": reply_markup.model_dump(exclude_none=True) if reply_markup is not None else None,
+    }
+    return OUTBOX_MESSAGE, payload, idempotency_key
+
+
+_CRM_KINDS = {OUTBOX_CRM_REQUEST, OUTBOX_CRM_EVENT}
+
+
+def crm_permanent_error(e: BaseException) -> bool:
+    # 4xx и ответ без crm_request_id повтором не исправить
+    return isinstance(e, CRMPermanentError)
+
+
+class OutboxDispatcher:
+    def __init__(self, bot: Bot, *, vk_sender=None) -> None:
+        self.bot = bot
+        self.vk_sender = vk_sender
+        self._permanent_checks = [telegram_permanent_error, crm_permanent_error]
+        if vk_sender is not None:
+            # vk_api ставится только в VK-образ
+            from app.infrastructure.messengers.vk import vk_permanent_error
+
+            self._permanent_checks.append(vk_permanent_error)
+        self._send_slots = asyncio.Semaphore(max(1, int(settings.outbox_send_concurrency)))
+        self._lease_seconds = int(settings.outbox_lease_seconds)
+        self._max_attempts = max(1, int(settings.outbox_max_attempts))
+        self._retry_seconds = float(settings.outbox_retry_seconds)
+        self._retry_max_seconds = float(settings.outbox_retry_max_seconds)
+        self.worker_id = worker_id("outbox")
+
+    @property
+    def batch_size(self) -> int:
+        return int(settings.outbox_batch_size)
+
+    async def tick(self) -> int:
+        now = datetime.utcnow()
+
+        async with AsyncSessionLocal() as session:
+            outbox = OutboxRepository(session)
+            rows = await outbox.claim(self.worker_id, now, limit=self.batch_size, lease_seconds=self._lease_seconds)
+            if not rows:
+                return 0
+
+            errors = await self._deliver(rows)
+
+            failed_at = datetime.utcnow()
+            failures: dict[int, tuple[str, datetime | None]] = {}
+            deferred: set[int] = set()
+            for row in rows:
+                error = errors.get(row.id)
+                if error is None:
+                    continue
+                exc, permanent = error
+                if row.kind in _CRM_KINDS and isinstance(exc, CRMTemporaryError):
+                    # CRM лежит (в т.ч. открыт breaker) — ждём её, не тратя попытки: заявку пользователю
+                    # уже подтвердили, часовой простой CRM не должен отправить её в dead
+                    delay = max(
+                        backoff_seconds(row.attempts + 1, self._retry_seconds, self._retry_max_seconds),
+                        get_crm_breaker().retry_in(),
+                    )
+                    failures[row.id] = (repr(exc), failed_at + timedelta(seconds=delay))
+                    deferred.add(row.id)
+                    log.info("outbox delivery deferred: id=%s kind=%s retry_in=%.0fs error=%r", row.id, row.kind, delay, exc)
+                    continue
+                attempts = row.attempts + 1
+                if permanent or attempts >= self._max_attempts:
+                    failures[row.id] = (repr(exc), None)
+                    log.error("outbox dead letter: id=%s kind=%s attempts=%s error=%r", row.id, row.kind, attempts, exc)
+                    continue
+                delay = backoff_seconds(attempts, self._retry_seconds, self._retry_max_seconds)
+                failures[row.id] = (repr(exc), failed_at + timedelta(seconds=delay))
+                log.warning(
+                    "outbox delivery failed: id=%s kind=%s attempts=%s retry_in=%.0fs error=%r",
+                    row.id,
+                    row.kind,
+                    attempts,
+                    delay,
+                    exc,
+                )
+
+            await outbox.mark_sent(self.worker_id, [row.id for row in rows if errors.get(row.id) is None])
+            await outbox.mark_failed(self.worker_id, failures, deferred=deferred)
+            await outbox.save()
+
+        return len(rows)
+
+    async def next_due_at(self) -> datetime | None:
+        async with AsyncSessionLocal() as session:
+            return await OutboxRepository(session).next_due_at()
+
+    async def _deliver(self, rows) -> dict[int, tuple[Exception, bool] | None]:
+        crm = get_crm_client()
+        batch_events = bool(getattr(crm, "supports_event_batch", False))
+        batched = [row for row in rows if batch_events and row.kind == OUTBOX_CRM_EVENT]
+        single = [row for row in rows if not (batch_events and row.kind == OUTBOX_CRM_EVENT)]
+
+        size = max(1, int(settings.crm_event_batch_size))
+        chunks = [batched[i:i + size] for i in range(0, len(batched), size)]
+
+        results: dict[int, tuple[Exception, bool] | None] = {}
+        for part in await asyncio.gather(
+            *(self._deliver_events(crm, chunk) for chunk in chunks),
+            *(self._deliver_one(row) for row in single),
+        ):
+            results.update(part)
+        return results
+
+    async def _deliver_events(self, crm, rows) -> dict[int, tuple[Exception, bool] | None]:
+        async with self._send_slots:
+            try:
+                await crm.send_events([(row.payload, row.idempotency_key) for row in rows])
+                return {row.id: None for row in rows}
+            except CRMTemporaryError as e:
+                # CRM недоступна — вся пачка уходит на повтор, поштучно долбить её смысла нет
+                return {row.id: (e, False) for row in rows}
+            except Exception as e:
+                log.warning("crm event batch rejected, falling back to single posts: size=%s error=%r", len(rows), e)
+
+        results: dict[int, tuple[Exception, bool] | None] = {}
+        for part in await asyncio.gather(*(self._deliver_one(row) for row in rows)):
+            results.update(part)
+        return results
+
+    async def _deliver_one(self, row) -> dict[int, tuple[Exception, bool] | None]:
+        async with self._send_slots:
+            try:
+                await self._dispatch(row.kind, row.payload, row.idempotency_key)
+            except Exception as e:
+                return {row.id: (e, any(check(e) for check in self._permanent_checks))}
+        return {row.id: None}
+
+    async def _dispatch(self, kind: str, payload: dict[str, Any], idempotency_key: str) -> None:
+        if kind == OUTBOX_MESSAGE:
+            await self._send_message(payload)
+            return
+
+        if kind == OUTBOX_CRM_EVENT:
+            await get_crm_client().send_event(payload, idempotency_key=idempotency_key)
+            return
+
+        if kind == OUTBOX_CRM_REQUEST:
+            await self._create_request(payload)
+            return
+
+        raise ValueError(f"unsupported outbox kind: {kind}")
+
+    async def _create_request(self, payload: dict[str, Any]) -> None:
+        client_request_id = str(payload["client_request_id"])
+        # повтор после сбоя безопасен: CRM дедуплицирует по client_request_id
+        resp = await get_crm_client().create_request(payload, idempotency_key=client_request_id)
+        crm_request_id = str(resp.get("crm_request_id") or "")
+        if not crm_request_id:
+            raise CRMPermanentError("create_request returned no crm_request_id")
+
+        async with AsyncSessionLocal() as session:
+            requests = RequestRepository(session)
+            await requests.set_crm_request_id(client_request_id, crm_request_id)
+            await requests.save()
+        log.info("crm request created: client_request_id=%s crm_request_id=%s", client_request_id, crm_request_id)
+
+    async def _send_message(self, payload: dict[str, Any]) -> None:
+        transport = payload.get("transport")
+        peer_id = int(payload["peer_id"])
+
+        if transport == "tg":
+            markup = payload.get("reply_markup")
+            await self.bot.send_message(
+                chat_id=peer_id,
+                text=payload["text"],
+                reply_markup=InlineKeyboardMarkup.model_validate(markup) if markup else None,
+            )
+            return
+
+        if transport == "vk":
+            if self.vk_sender is None:
+                raise RuntimeError("vk_sender is not configured")
+            await self.vk_sender(peer_id, payload["text"])
+            return
+
+        raise ValueError(f"unsupported transport: {transport}")
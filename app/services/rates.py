@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from app.config import settings
+from app.infrastructure.crm_client import get_crm_client
+
+log = logging.getLogger("crm")
+
+RateKey = tuple[str, str]
+
+
+class RateCache:
+    def __init__(self, *, ttl_seconds: float | None = None, refresh_ahead: float | None = None) -> None:
+        self._ttl = float(settings.rate_cache_ttl_seconds if ttl_seconds is None else ttl_seconds)
+        ratio = float(settings.rate_cache_refresh_ahead if refresh_ahead is None else refresh_ahead)
+        self._refresh_after = self._ttl * min(max(ratio, 0.0), 1.0)
+        self._rates: dict[RateKey, tuple[float, float]] = {}
+        self._inflight: dict[RateKey, asyncio.Task] = {}
+
+    async def get(self, office_id: str, direction: str) -> float:
+        key = (str(office_id), str(direction))
+        cached = self._rates.get(key)
+        if cached is not None:
+            fetched_at, rate = cached
+            age = time.monotonic() - fetched_at
+            if age < self._ttl:
+                if age >= self._refresh_after and key not in self._inflight:
+                    self._start_fetch(key).add_done_callback(_log_refresh_error)
+                return rate
+
+        # просроченный курс не отдаём: ждём CRM, одновременные запросы делят один вызов
+        task = self._inflight.get(key) or self._start_fetch(key)
+        return await asyncio.shield(task)
+
+    def invalidate(self, office_id: str | None = None, direction: str | None = None) -> None:
+        for key in list(self._rates):
+            if (office_id is None or key[0] == str(office_id)) and (direction is None or key[1] == str(direction)):
+                del self._rates[key]
+
+    def _start_fetch(self, key: RateKey) -> asyncio.Task:
+        task = asyncio.create_task(self._fetch(key))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch(self, key: RateKey) -> float:
+        office_id, direction = key
+        rate = float(await get_crm_client().get_rate(office_id, direction))  # type: ignore[arg-type]
+        self._rates[key] = (time.monotonic(), rate)
+        return rate
+
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.warning("rate refresh-ahead failed: %r", task.exception())
+
+
+_cache: RateCache | None = None
+
+
+def get_rate_cache() -> RateCache:
+    global _cache
+    if _cache is None:
+        _cache = RateCache()
+    return _cache
@@ -11,8 +11,12 @@ from sqlalchemy.exc import IntegrityError
 from app.config import settings
 from app.models import Draft, Request, Direction
 from app.repositories.drafts import DraftRepository
+from app.repositories.nudge_jobs import NudgeJobRepository
+from app.repositories.outbox import OUTBOX_CRM_REQUEST, OutboxRepository
 from app.repositories.requests import RequestRepository
-from app.infrastructure.crm_client import get_crm_client, CRMTemporaryError, CRMPermanentError
+from app.infrastructure.crm_client import CRMTemporaryError, CRMPermanentError
+from app.services.offices import get_office_directory
+from app.services.rates import get_rate_cache
 
 log = logging.getLogger("crm")
 
@@ -29,6 +33,25 @@ def _money(x: float) -> str:
     return f"{x:.2f}".rstrip("0").rstrip(".")
 
 
+def _quote_key(draft: Draft) -> str:
+    # котировка привязана к условиям черновика: поменяли сумму/офис/дату — считаем заново
+    direction = draft.direction.value if isinstance(draft.direction, Direction) else str(draft.direction)
+    return f"{direction}|{float(draft.give_amount or 0)}|{draft.office_id}|{draft.desired_date}"
+
+
+def _valid_quote(draft: Draft, now: datetime) -> tuple[float, float, str] | None:
+    if (
+        draft.quote_rate is None
+        or draft.quote_receive_amount is None
+        or not draft.quote_summary_text
+        or draft.quote_expires_at is None
+        or draft.quote_expires_at <= now
+        or draft.quote_key != _quote_key(draft)
+    ):
+        return None
+    return float(draft.quote_rate), float(draft.quote_receive_amount), draft.quote_summary_text
+
+
 def _new_client_request_id() -> str:
     return uuid.uuid4().hex[:16] + "-" + str(int(datetime.utcnow().timestamp()))
 
@@ -54,10 +77,50 @@ class ConfirmResult:
     crm_request_id: str | None
 
 
+def _plan_request_nudges(req: Request) -> dict[str, datetime]:
+    now = datetime.utcnow()
+    today = now.date()
+    planned: dict[str, datetime] = {
+        "nudge1": now + timedelta(seconds=settings.nudge1_delay_seconds),
+    }
+
+    if settings.nudge5_test_mode:
+        planned["nudge5"] = now + timedelta(seconds=settings.nudge5_test_delay_seconds)
+    else:
+        if req.desired_date and req.desired_date != today:
+            if req.desired_date >= (today + timedelta(days=settings.nudge5_lead_days)):
+                planned_day_5 = req.desired_date - timedelta(days=settings.nudge5_lead_days)
+                planned["nudge5"] = _istanbul_10_to_utc_naive(planned_day_5)
+
+    if settings.nudge6_test_mode:
+        planned["nudge6"] = now + timedelta(seconds=settings.nudge6_test_delay_seconds)
+    else:
+        if req.desired_date and req.desired_date != today:
+            if req.desired_date >= (today + timedelta(days=settings.nudge6_lead_days)):
+                planned_day_6 = req.desired_date - timedelta(days=settings.nudge6_lead_days)
+                planned["nudge6"] = _istanbul_10_to_utc_naive(planned_day_6)
+
+    if settings.nudge7_test_mode:
+        planned["nudge7"] = now + timedelta(seconds=settings.nudge7_test_delay_seconds)
+    else:
+        if req.desired_date:
+            planned["nudge7"] = _istanbul_10_to_utc_naive(req.desired_date)
+
+    return planned
+
+
 class RequestService:
-    def __init__(self, draft_repo: DraftRepository, request_repo: RequestRepository) -> None:
+    def __init__(
+        self,
+        draft_repo: DraftRepository,
+        request_repo: RequestRepository,
+        nudge_job_repo: NudgeJobRepository,
+        outbox_repo: OutboxRepository,
+    ) -> None:
         self._drafts = draft_repo
         self._requests = request_repo
+        self._nudge_jobs = nudge_job_repo
+        self._outbox = outbox_repo
 
     async def ensure_client_request_id(self, draft: Draft) -> str:
         if draft.client_request_id:
@@ -84,10 +147,9 @@ class RequestService:
 
         await self.ensure_client_request_id(draft)
 
-        crm = get_crm_client()
         try:
-            rate = await crm.get_rate(str(draft.office_id), direction)  # type: ignore[arg-type]
-            office_label = await crm.get_office_label(str(draft.office_id))
+            rate = await get_rate_cache().get(str(draft.office_id), direction)
+            office_label = await get_office_directory().label(str(draft.office_id))
         except (CRMTemporaryError, CRMPermanentError):
             log.exception("CRM error on summary (office_id=%s, direction=%s)", draft.office_id, direction)
             raise
@@ -116,8 +178,14 @@ class RequestService:
             "Если хотите что-то поправить – нажмите «Нет, хочу внести изменения»."
         )
 
+        now = datetime.utcnow()
+        draft.quote_rate = float(rate)
+        draft.quote_receive_amount = float(receive_amount)
+        draft.quote_summary_text = summary_text
+        draft.quote_key = _quote_key(draft)
+        draft.quote_expires_at = now + timedelta(seconds=int(settings.quote_ttl_seconds))
         draft.last_step = "summary"
-        draft.updated_at = datetime.utcnow()
+        draft.updated_at = now
         await self._drafts.save()
 
         return SummaryResult(
@@ -166,10 +234,14 @@ class RequestService:
             return ConfirmResult(created=False, already_exists=True, crm_request_id=existing.crm_request_id)
 
         if not rate or not receive_amount or not summary_text:
-            summary = await self.build_summary_ctx(transport, peer_id)
-            rate = summary.rate
-            receive_amount = summary.receive_amount
-            summary_text = summary.summary_text
+            quote = _valid_quote(draft, datetime.utcnow())
+            if quote is not None:
+                rate, receive_amount, summary_text = quote
+            else:
+                summary = await self.build_summary_ctx(transport, peer_id)
+                rate = summary.rate
+                receive_amount = summary.receive_amount
+                summary_text = summary.summary_text
 
         req = Request(
             transport=transport,
@@ -187,32 +259,6 @@ class RequestService:
             summary_text=str(summary_text),
         )
 
-        req.nudge1_planned_at = datetime.utcnow() + timedelta(seconds=settings.nudge1_delay_seconds)
-
-        today = datetime.utcnow().date()
-
-        if settings.nudge5_test_mode:
-            req.nudge5_planned_at = datetime.utcnow() + timedelta(seconds=settings.nudge5_test_delay_seconds)
-        else:
-            if req.desired_date and req.desired_date != today:
-                if req.desired_date >= (today + timedelta(days=settings.nudge5_lead_days)):
-                    planned_day_5 = req.desired_date - timedelta(days=settings.nudge5_lead_days)
-                    req.nudge5_planned_at = _istanbul_10_to_utc_naive(planned_day_5)
-
-        if settings.nudge6_test_mode:
-            req.nudge6_planned_at = datetime.utcnow() + timedelta(seconds=settings.nudge6_test_delay_seconds)
-        else:
-            if req.desired_date and req.desired_date != today:
-                if req.desired_date >= (today + timedelta(days=settings.nudge6_lead_days)):
-                    planned_day_6 = req.desired_date - timedelta(days=settings.nudge6_lead_days)
-                    req.nudge6_planned_at = _istanbul_10_to_utc_naive(planned_day_6)
-
-        if settings.nudge7_test_mode:
-            req.nudge7_planned_at = datetime.utcnow() + timedelta(seconds=settings.nudge7_test_delay_seconds)
-        else:
-            if req.desired_date:
-                req.nudge7_planned_at = _istanbul_10_to_utc_naive(req.desired_date)
-
         try:
             await self._requests.create(req)
         except IntegrityError:
@@ -224,7 +270,9 @@ class RequestService:
                 crm_request_id=(existing2.crm_request_id if existing2 else None),
             )
 
-        crm = get_crm_client()
+        for kind, due_at in _plan_request_nudges(req).items():
+            await self._nudge_jobs.schedule(kind, req.id, transport=transport, peer_id=peer_id, due_at=due_at)
+
         payload = {
             "client_request_id": client_request_id,
             "transport": transport,
@@ -238,19 +286,11 @@ class RequestService:
             "rate": req.rate,
             "receive_amount": req.receive_amount,
         }
-
-        try:
-            crm_resp = await crm.create_request(payload, idempotency_key=client_request_id)
-        except CRMTemporaryError:
-            raise
-        except CRMPermanentError:
-            raise
-
-        req.crm_request_id = str(crm_resp.get("crm_request_id") or "")
-        await self._requests.save()
+        # заявку в CRM создаёт outbox dispatcher и потом проставляет crm_request_id
+        await self._outbox.add(OUTBOX_CRM_REQUEST, payload, idempotency_key=f"create:{client_request_id}")
 
         draft.last_step = "done"
         draft.updated_at = datetime.utcnow()
-        await self._drafts.save()
+        await self._requests.save()
 
         return ConfirmResult(created=True, already_exists=False, crm_request_id=req.crm_request_id)
\ No newline at end of file
@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Draft, Request
+from app.repositories.drafts import DraftRepository
+from app.repositories.requests import RequestRepository
+
+_UNSET = object()
+
+
+class UserContext:
+    def __init__(self, session: AsyncSession, *, transport: str, peer_id: int, telegram_user_id: int | None = None) -> None:
+        self.session = session
+        self.transport = transport
+        self.peer_id = peer_id
+        self.telegram_user_id = telegram_user_id
+        self._drafts = DraftRepository(session)
+        self._latest_request = _UNSET
+
+    async def draft(self) -> Draft | None:
+        return await self._drafts.get_by_transport_peer_id(self.transport, self.peer_id)
+
+    async def draft_or_create(self) -> Draft:
+        return await self._drafts.get_or_create(
+            self.transport,
+            self.peer_id,
+            telegram_user_id=self.telegram_user_id,
+        )
+
+    async def stage(self, draft: Draft, **values) -> None:
+        await self._drafts.stage(draft, **values)
+
+    async def latest_request(self) -> Request | None:
+        if self._latest_request is _UNSET:
+            if self.telegram_user_id is None:
+                self._latest_request = None
+            else:
+                self._latest_request = await RequestRepository(self.session).get_latest_by_telegram_user_id(
+                    self.telegram_user_id
+                )
+        return self._latest_request
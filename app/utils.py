@@ -1,9 +1,16 @@
 from __future__ import annotations
 
+import hashlib
+import os
+import random
 import re
+import socket
+import uuid
 from datetime import date
 from zoneinfo import ZoneInfo
 
+from app.config import settings
+
 TZ_TR = ZoneInfo("Europe/Istanbul")
 
 USERNAME_RE = re.compile(r"^[A-Za-z0-9_]{5,32}$")
@@ -14,6 +21,29 @@ def today_tr() -> date:
     return date.today().replace() if True else date.today()  # оставлено простым, дата без tz
 
 
+# lease_owner — String(64)
+LEASE_OWNER_MAX_LEN = 64
+
+
+def _shorten(value: str, limit: int) -> str:
+    if len(value) <= limit:
+        return value
+    digest = hashlib.sha1(value.encode()).hexdigest()[:8]
+    return f"{value[:limit - 9]}-{digest}"
+
+
+def worker_id(suffix: str = "") -> str:
+    # имя пода в k8s бывает до 63 символов: без укорачивания claim падает на StringDataRightTruncation
+    tail = f":{suffix}" if suffix else ""
+    base = settings.nudge_worker_id or f"{_shorten(socket.gethostname(), 32)}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+    return _shorten(base, LEASE_OWNER_MAX_LEN - len(tail)) + tail
+
+
+def backoff_seconds(attempts: int, base: float, cap: float) -> float:
+    delay = float(base) * (2 ** max(attempts - 1, 0))
+    return min(float(cap), delay * random.uniform(0.8, 1.2))
+
+
 def parse_amount(raw: str) -> float:
     raw = raw.strip().replace(",", ".")
     val = float(raw)
@@ -7,6 +7,8 @@ from vk_api.longpoll import VkEventType, VkLongPoll
 
 from app.config import settings
 from app.db import AsyncSessionLocal
+from app.infrastructure.messengers.vk import vk_retry_after
+from app.infrastructure.outbound import get_outbound_scheduler
 
 logger = logging.getLogger("vk")
 
@@ -44,6 +46,7 @@ async def run_vk_bot() -> None:
     longpoll = VkLongPoll(vk_session)
 
     loop = asyncio.get_running_loop()
+    outbound = get_outbound_scheduler("vk")
 
     logger.info("VK bot started, group_id=%s", getattr(settings, "VK_GROUP_ID", None))
 
@@ -93,13 +96,21 @@ async def run_vk_bot() -> None:
 
                 if out_text:
                     try:
-                        await loop.run_in_executor(None, _send, api, peer_id, out_text, out_kb)
+                        await outbound.send(
+                            peer_id,
+                            lambda: loop.run_in_executor(None, _send, api, peer_id, out_text, out_kb),
+                            retry_after=vk_retry_after,
+                        )
                     except Exception:
                         logger.exception("VK send failed: peer_id=%s", peer_id)
 
             except Exception:
                 logger.exception("vk handler failed: peer_id=%s user_id=%s text=%r", peer_id, user_id, text)
                 try:
-                    await loop.run_in_executor(None, _send, api, peer_id, "Произошла ошибка. Попробуйте ещё раз.", None)
+                    await outbound.send(
+                        peer_id,
+                        lambda: loop.run_in_executor(None, _send, api, peer_id, "Произошла ошибка. Попробуйте ещё раз.", None),
+                        retry_after=vk_retry_after,
+                    )
                 except Exception:
                     logger.exception("VK error message send failed: peer_id=%s", peer_id)
\ No newline at end of file
@@ -1,28 +1,24 @@
 import asyncio
 import logging
 
-from app.config import settings
-from app.db import engine
-from app.models import Base
+from app.infrastructure.crm_client import close_crm_client, init_crm_client
+from app.migrations import ensure_schema
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("vk")
 
 
-async def ensure_db_schema() -> None:
-    import app.models  # noqa: F401
-
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
-
-
 async def process() -> None:
-    if getattr(settings, "DB_AUTO_CREATE", False):
-        await ensure_db_schema()
+    await ensure_schema()
+
+    init_crm_client()
 
     from app.vk.bot import run_vk_bot
 
-    await run_vk_bot()
+    try:
+        await run_vk_bot()
+    finally:
+        await close_crm_client()
 
 
 def main() -> None:
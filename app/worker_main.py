@@ -3,13 +3,27 @@ from __future__ import annotations
 import asyncio
 
 from app.bootstrap import build_bot, setup_logging
-from app.infrastructure.worker import run_nudge_worker
+from app.infrastructure.crm_client import close_crm_client, init_crm_client
+from app.infrastructure.crm_webhook import run_crm_webhook
+from app.infrastructure.outbound import ROLE_WORKER, set_outbound_role
+from app.infrastructure.worker import run_crm_status_sync, run_nudge_worker, run_outbox_dispatcher
 
 
 async def main() -> None:
     setup_logging()
+    set_outbound_role(ROLE_WORKER)
+    init_crm_client()
     bot = build_bot()
-    await run_nudge_worker(bot)
+    try:
+        await asyncio.gather(
+            run_nudge_worker(),
+            run_outbox_dispatcher(bot),
+            run_crm_webhook(),
+            run_crm_status_sync(),
+        )
+    finally:
+        await close_crm_client()
+        await bot.session.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,3 @@
+import os
+
+os.environ.setdefault("BOT_TOKEN", "1:test")
@@ -0,0 +1,96 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+
+from app.infrastructure import draft_buffer
+from app.infrastructure.draft_buffer import DraftBuffer
+from app.models import Draft
+
+
+@pytest.fixture
+def buffer(monkeypatch):
+    buffer = DraftBuffer(flush_seconds=1)
+    monkeypatch.setattr(draft_buffer, "_buffer", buffer)
+    draft_buffer._listen()
+    yield buffer
+    draft_buffer._unlisten()
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Draft.__table__.create(engine)
+    with Session(engine) as session:
+        session.add(Draft(id=1, transport="tg", peer_id=1, telegram_user_id=1, last_step="start"))
+        session.commit()
+    return engine
+
+
+def _stage(engine, buffer: DraftBuffer) -> None:
+    with Session(engine) as session:
+        draft = session.get(Draft, 1)
+        buffer.stage(draft, {"give_amount": 150.0, "last_step": "amount", "updated_at": datetime.utcnow()})
+
+
+def _overlaid(buffer: DraftBuffer) -> Draft:
+    draft = Draft(id=1, transport="tg", peer_id=1)
+    buffer.overlay(draft)
+    return draft
+
+
+def test_rolled_back_flush_keeps_staged_values(engine, buffer):
+    _stage(engine, buffer)
+
+    with Session(engine) as session:
+        draft = session.get(Draft, 1)
+        draft.office_id = "ist"
+        session.flush()
+        assert buffer.size == 0
+        session.rollback()
+
+    assert buffer.size == 1
+    assert _overlaid(buffer).give_amount == 150.0
+    with Session(engine) as session:
+        assert session.scalar(select(Draft.give_amount).where(Draft.id == 1)) is None
+
+
+def test_session_closed_without_commit_keeps_staged_values(engine, buffer):
+    _stage(engine, buffer)
+
+    with Session(engine) as session:
+        session.get(Draft, 1).office_id = "ist"
+        session.flush()
+
+    assert buffer.size == 1
+    assert _overlaid(buffer).last_step == "amount"
+
+
+def test_commit_writes_staged_values_once(engine, buffer):
+    _stage(engine, buffer)
+
+    with Session(engine) as session:
+        draft = session.get(Draft, 1)
+        draft.office_id = "ist"
+        session.commit()
+
+    assert not buffer.has_staged()
+    with Session(engine) as session:
+        draft = session.get(Draft, 1)
+        assert (draft.give_amount, draft.last_step, draft.office_id) == (150.0, "amount", "ist")
+
+
+def test_handler_value_wins_over_staged(engine, buffer):
+    _stage(engine, buffer)
+
+    with Session(engine) as session:
+        draft = session.get(Draft, 1)
+        draft.last_step = "office"
+        session.flush()
+        # повторный autoflush не накатывает буфер поверх правки хендлера
+        draft.office_id = "ist"
+        session.commit()
+
+    with Session(engine) as session:
+        assert session.get(Draft, 1).last_step == "office"
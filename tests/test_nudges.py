@@ -0,0 +1,105 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.models import Request
+from app.repositories.nudge_jobs import JOB_DEAD, JOB_PENDING, NudgeJobRepository
+from app.services.nudges import NudgeService
+
+
+def _row(attempts: int):
+    return SimpleNamespace(
+        id=1, kind="nudge1", target_id=7, transport="tg", peer_id=42, due_at=datetime.utcnow(), attempts=attempts
+    )
+
+
+def _service(monkeypatch, req: Request, *, unavailable: bool = True) -> NudgeService:
+    service = NudgeService()
+
+    async def load_targets(session, rows):
+        return {(Request, req.id): req}
+
+    async def resolve_with_failures(ids):
+        # unavailable — CRM недоступна / breaker открыт; иначе статус не разрешился (4xx, нет в ответе)
+        return {}, set(ids) if unavailable else set()
+
+    monkeypatch.setattr(service, "_load_targets", load_targets)
+    monkeypatch.setattr(service._statuses, "resolve_with_failures", resolve_with_failures)
+    return service
+
+
+def test_crm_outage_defers_without_spending_attempt(monkeypatch):
+    req = Request(id=7, crm_request_id="crm-7", status_synced_at=None)
+    service = _service(monkeypatch, req)
+    now = datetime.utcnow()
+
+    # последняя попытка: при обычной ошибке задание ушло бы в dead
+    (d,) = asyncio.run(service._prepare(None, [_row(service._max_attempts - 1)], now))
+
+    assert d.state == JOB_PENDING
+    assert d.deferred
+    assert d.attempts == service._max_attempts - 1
+    assert d.retry_at is not None and d.retry_at > now
+
+
+def test_unresolvable_status_spends_attempts_and_dead_letters(monkeypatch):
+    req = Request(id=7, crm_request_id="crm-7", status_synced_at=None)
+    service = _service(monkeypatch, req, unavailable=False)
+
+    (d,) = asyncio.run(service._prepare(None, [_row(0)], datetime.utcnow()))
+    assert d.state == JOB_PENDING and not d.deferred and d.attempts == 1
+
+    (d,) = asyncio.run(service._prepare(None, [_row(service._max_attempts - 1)], datetime.utcnow()))
+    assert d.state == JOB_DEAD
+
+
+def test_check_failure_still_dead_letters(monkeypatch):
+    req = Request(id=7, crm_request_id=None, status_synced_at=None)
+    service = _service(monkeypatch, req)
+
+    async def broken(*args):
+        raise RuntimeError("boom")
+
+    service._handlers["nudge1"] = broken
+    (d,) = asyncio.run(service._prepare(None, [_row(service._max_attempts - 1)], datetime.utcnow()))
+
+    assert d.state == JOB_DEAD
+    assert not d.deferred
+
+
+def test_finish_many_keeps_attempts_of_deferred_jobs():
+    captured = []
+
+    class Session:
+        async def execute(self, stmt):
+            captured.append(stmt)
+            return SimpleNamespace(scalars=lambda: iter([1, 2]))
+
+    repo = NudgeJobRepository(Session())
+    asyncio.run(repo.finish_many("w", {1: JOB_PENDING, 2: JOB_PENDING}, deferred={1}))
+
+    sql = str(captured[0].compile(dialect=postgresql.dialect()))
+    assert "attempts=CASE WHEN (nudge_jobs.id IN" in sql
+    assert "THEN nudge_jobs.attempts ELSE nudge_jobs.attempts +" in sql
+
+
+def test_resolver_separates_unavailable_from_unresolved(monkeypatch):
+    from app.infrastructure.crm_client import CRMPermanentError, CRMTemporaryError
+    from app.services import crm_status
+    from app.services.crm_status import CRMStatusResolver
+
+    class Crm:
+        async def check_status(self, crm_request_id):
+            if crm_request_id == "down":
+                raise CRMTemporaryError("503")
+            if crm_request_id == "bad":
+                raise CRMPermanentError("404")
+            return {"status": "new"}
+
+    monkeypatch.setattr(crm_status, "get_crm_client", lambda: Crm())
+    statuses, unavailable = asyncio.run(CRMStatusResolver().resolve_with_failures(["ok", "down", "bad"]))
+
+    assert set(statuses) == {"ok"}
+    assert unavailable == {"down"}
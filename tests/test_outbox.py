@@ -0,0 +1,73 @@
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+from app.infrastructure.crm_client import CRMCircuitOpenError, CRMPermanentError, CRMTemporaryError
+from app.repositories.outbox import OUTBOX_CRM_REQUEST
+from app.services import outbox as outbox_module
+from app.services.outbox import OutboxDispatcher
+
+
+class _Session:
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _Outbox:
+    failed: dict = {}
+    deferred: set = set()
+    attempts = 0
+
+    def __init__(self, session):
+        pass
+
+    async def claim(self, owner, now, *, limit, lease_seconds):
+        return [
+            SimpleNamespace(id=1, kind=OUTBOX_CRM_REQUEST, payload={}, idempotency_key="k", attempts=_Outbox.attempts)
+        ]
+
+    async def mark_sent(self, owner, ids):
+        pass
+
+    async def mark_failed(self, owner, failures, *, deferred=None):
+        _Outbox.failed = failures
+        _Outbox.deferred = deferred or set()
+
+    async def save(self):
+        pass
+
+
+def _tick(monkeypatch, error: Exception, *, attempts: int = 0) -> dict:
+    _Outbox.attempts = attempts
+    monkeypatch.setattr(outbox_module, "AsyncSessionLocal", _Session)
+    monkeypatch.setattr(outbox_module, "OutboxRepository", _Outbox)
+    dispatcher = OutboxDispatcher(bot=None)
+
+    async def dispatch(kind, payload, idempotency_key):
+        raise error
+
+    monkeypatch.setattr(dispatcher, "_dispatch", dispatch)
+    asyncio.run(dispatcher.tick())
+    return _Outbox.failed
+
+
+def test_permanent_crm_error_goes_dead_after_one_attempt(monkeypatch):
+    failures = _tick(monkeypatch, CRMPermanentError("crm create request: no crm_request_id"))
+    assert failures[1][1] is None
+    assert 1 not in _Outbox.deferred
+
+
+def test_temporary_crm_error_is_retried(monkeypatch):
+    failures = _tick(monkeypatch, CRMTemporaryError("503"))
+    assert failures[1][1] is not None and failures[1][1] > datetime.utcnow()
+
+
+def test_open_breaker_past_max_attempts_keeps_crm_request_pending(monkeypatch):
+    max_attempts = OutboxDispatcher(bot=None)._max_attempts
+    for attempts in (max_attempts - 1, max_attempts, max_attempts + 5):
+        failures = _tick(monkeypatch, CRMCircuitOpenError("crm circuit open"), attempts=attempts)
+        assert failures[1][1] is not None
+        assert _Outbox.deferred == {1}